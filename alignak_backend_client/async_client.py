@@ -0,0 +1,693 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (C) 2015-2018: AlignakBackend team, see AUTHORS.txt file for contributors
+#
+# This file is part of AlignakBackend.
+#
+# AlignakBackend is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# AlignakBackend is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with AlignakBackend.  If not, see <http://www.gnu.org/licenses/>.
+"""
+    Alignak REST backend asyncio client library
+    ===========================================
+
+    This module provides the `AsyncBackend` class, an asyncio flavour of the `Backend` class.
+
+    It exposes the same `login`, `logout`, `get`, `get_all`, `post`, `patch`, `put` and `delete`
+    methods as coroutines, raises the same `BackendException` errors and decodes the backend
+    responses with the same rules. As such, hundreds of requests may run concurrently on a
+    single event loop::
+
+        backend = AsyncBackend('http://127.0.0.1:5000', concurrency=100)
+        await backend.login('admin', 'admin')
+        hosts, services = await asyncio.gather(backend.get_all('host'),
+                                               backend.get_all('service'))
+        await backend.logout()
+
+    This module requires Python 3.5+ and the `aiohttp` library.
+"""
+import asyncio
+import json as stdjson
+import math
+import random
+from logging import getLogger
+
+from future.moves.urllib.parse import urljoin
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - optional dependency
+    aiohttp = None
+
+from alignak_backend_client.client import BackendException, BACKEND_ERROR, \
+    BACKEND_PAGINATION_PROBE, PROXY_PROTOCOLS, RETRY_METHODS, RETRY_STATUSES
+from alignak_backend_client.codec import get_codec
+
+logger = getLogger('alignak_backend_client.client')
+
+# Default number of concurrent requests for an asynchronous client
+ASYNC_CONCURRENCY = 100
+
+
+class AsyncResponse(object):  # pylint: disable=useless-object-inheritance, too-few-public-methods
+    """
+    Backend response read by the asynchronous client
+
+    The response body is fully read when the object is built, so that it may be decoded
+    (or logged in a BackendException) after the underlying connection got released.
+    """
+    def __init__(self, status_code, reason, url, headers, content):
+        # pylint: disable=too-many-arguments
+        self.status_code = status_code
+        self.reason = reason
+        self.url = url
+        self.headers = headers
+        self.content = content
+
+    def json(self):
+        """Returns the response content decoded as JSON"""
+        return stdjson.loads(self.content.decode('utf-8'))
+
+
+class AsyncBackend(object):  # pylint: disable=useless-object-inheritance
+    """
+    Backend asyncio client class to communicate with an Alignak backend
+
+    Provide the backend endpoint URL to initialize the client (eg. http://127.0.0.1:5000)
+    and the maximum number of requests that may be in progress at the same time.
+
+    The HTTP session is created on the first request (within the running event loop) and
+    it must be closed with `logout` or `close`. The client may also be used as an
+    asynchronous context manager.
+
+    The page size, the timeouts and the retries are configured as for the `Backend` class.
+    """
+    def __init__(self, endpoint, concurrency=ASYNC_CONCURRENCY, codec=None, page_size=None,
+                 connect_timeout=None, read_timeout=None, retries=5, retry_backoff=0.1,
+                 retry_jitter=0.5, retry_statuses=None):
+        # pylint: disable=too-many-arguments
+        """
+        Initialize a client connection
+
+        :param endpoint: root endpoint (API URL)
+        :type endpoint: str
+        :param concurrency: maximum number of simultaneous requests
+        :type concurrency: int
+        :param codec: JSON codec name (orjson, ujson or json), default is the fastest installed
+        :type codec: str
+        :param page_size: page size requested when getting all items (default is the backend
+                          pagination limit)
+        :type page_size: int
+        :param connect_timeout: maximum time to connect to the backend, in seconds
+        :type connect_timeout: float
+        :param read_timeout: maximum time between two bytes of the backend response, in seconds
+        :type read_timeout: float
+        :param retries: maximum number of retries of a request
+        :type retries: int
+        :param retry_backoff: backoff factor of the delay between the retries, in seconds
+        :type retry_backoff: float
+        :param retry_jitter: random reduction of the delay between the retries, from 0 to 1
+        :type retry_jitter: float
+        :param retry_statuses: status codes of the retried responses, default is RETRY_STATUSES
+        :type retry_statuses: list
+        """
+        if aiohttp is None:  # pragma: no cover - optional dependency
+            raise ImportError("The aiohttp library is required for the asynchronous client")
+        self.codec = get_codec(codec)
+        if self.codec is None:
+            raise BackendException(BACKEND_ERROR, "Unavailable JSON codec: %s" % codec)
+
+        self.concurrency = concurrency
+        if endpoint.endswith('/'):  # pragma: no cover - test url is complying ...
+            self.url_endpoint_root = endpoint[0:-1]
+        else:
+            self.url_endpoint_root = endpoint
+
+        self.session = None
+        self._semaphore = None
+
+        self.authenticated = False
+        self._token = None
+        self.proxies = None
+
+        self.page_size = page_size
+        self._page_sizes = {}
+
+        self.timeout = None
+        if connect_timeout is not None or read_timeout is not None:
+            self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.retry_jitter = retry_jitter
+        self.retry_statuses = retry_statuses if retry_statuses is not None else RETRY_STATUSES
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def get_url(self, endpoint):
+        """
+        Returns the formated full URL endpoint
+        :param endpoint: str. the relative endpoint to access
+        :return: str
+        """
+        return urljoin(self.url_endpoint_root, endpoint)
+
+    def _get_session(self):
+        """
+        Get the current HTTP session, create a new one if none still exists
+
+        :return: aiohttp.ClientSession
+        """
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency)
+            self.session = aiohttp.ClientSession(connector=connector)
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self.session
+
+    async def close(self):
+        """
+        Close the HTTP session
+
+        :return: None
+        """
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    @staticmethod
+    def _get_params(params):
+        """
+        Format the query string parameters
+
+        aiohttp only accepts strings and numbers as parameters values, dict and list values are
+        JSON encoded and the other values are converted to strings.
+
+        :param params: parameters for the backend API
+        :type params: dict
+        :return: formatted parameters
+        :rtype: dict
+        """
+        if not params:
+            return None
+
+        formatted = {}
+        for key, value in params.items():
+            if isinstance(value, (dict, list)):
+                value = stdjson.dumps(value)
+            formatted[key] = str(value)
+        return formatted
+
+    @staticmethod
+    def _get_timeout(timeout):
+        """
+        Get the aiohttp timeout of a request
+
+        :param timeout: timeout of the connection and of the response reading, in seconds, or
+                        a (connect, read) tuple
+        :type timeout: float or tuple
+        :return: aiohttp.ClientTimeout or None
+        """
+        if timeout is None:
+            return None
+        if not isinstance(timeout, tuple):
+            timeout = (timeout, timeout)
+        return aiohttp.ClientTimeout(total=None, sock_connect=timeout[0], sock_read=timeout[1])
+
+    def _get_backoff(self, retry, response=None):
+        """
+        Get the delay before retrying a request
+
+        The delay is the Retry-After delay of the backend response, else an exponential backoff
+        randomly reduced by up to `retry_jitter`, as for the `Backend` class.
+
+        :param retry: number of the retry, from 1
+        :type retry: int
+        :param response: backend response, None for a request without response
+        :type response: AsyncResponse
+        :return: delay, in seconds
+        :rtype: float
+        """
+        if response is not None:
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                return float(retry_after)
+        if retry <= 1:
+            return 0
+        backoff = self.retry_backoff * (2 ** (retry - 1))
+        return backoff * (1 - self.retry_jitter * random.random())
+
+    def _get_proxy(self, url):
+        """
+        Get the proxy URL to use for the requested URL
+
+        :param url: requested URL
+        :type url: str
+        :return: proxy URL or None
+        """
+        if not self.proxies:
+            return None
+        return self.proxies.get(url.split(':', 1)[0])
+
+    async def get_response(self, method, endpoint, headers=None, json=None, params=None,
+                           data=None, timeout=None):
+        # pylint: disable=too-many-arguments,too-many-locals
+        """
+        Returns the response from the requested endpoint with the requested method
+
+        The requests are retried as the `Backend` requests: on a connection error, and for the
+        RETRY_METHODS on a read error or on a `retry_statuses` response.
+
+        :param method: str. one of the HTTP methods ('POST', 'GET', ...)
+        :param endpoint: str. the relative endpoint to access
+        :param params: (optional) Dictionary to be sent in the query string
+        :param data: (optional) Dictionary or bytes to send in the body of the request
+        :param json: (optional) json to send in the body of the request
+        :param headers: (optional) Dictionary of HTTP Headers to send with the request
+        :param timeout: (optional) timeout in seconds, or a (connect, read) tuple, default is
+                        the client timeouts
+        :return: AsyncResponse
+        """
+        logger.debug("Parameters for get_response:")
+        logger.debug("\t - endpoint: %s", endpoint)
+        logger.debug("\t - method: %s", method)
+        logger.debug("\t - headers: %s", headers)
+        logger.debug("\t - json: %s", json)
+        logger.debug("\t - params: %s", params)
+        logger.debug("\t - data: %s", data)
+
+        url = self.get_url(endpoint)
+        session = self._get_session()
+        kwargs = {}
+        if self._token:
+            kwargs['auth'] = aiohttp.BasicAuth(self._token, '')
+        timeout = self._get_timeout(timeout or self.timeout)
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+        if json is not None:
+            data = self.codec.dumps(json)
+            headers = dict(headers or {})
+            headers['Content-Type'] = 'application/json'
+
+        retry = 0
+        while True:
+            # First stage. Errors are connection errors (timeout, no session, ...)
+            try:
+                async with self._semaphore:
+                    async with session.request(method, url, headers=headers,
+                                               params=self._get_params(params), data=data,
+                                               proxy=self._get_proxy(url), **kwargs) as resp:
+                        content = await resp.read()
+                        response = AsyncResponse(resp.status, resp.reason, str(resp.url),
+                                                 resp.headers, content)
+                logger.debug("response headers: %s", response.headers)
+                logger.debug("response content: %s", response.content)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                connection_error = isinstance(e, aiohttp.ClientConnectorError)
+                if retry < self.retries and (connection_error or method in RETRY_METHODS):
+                    retry += 1
+                    logger.debug("retrying %s %s (%d) after: %s", method, endpoint, retry, e)
+                    await asyncio.sleep(self._get_backoff(retry))
+                    continue
+                response = {"_status": "ERR",
+                            "_error": {"message": e, "code": BACKEND_ERROR},
+                            "_issues": {"message": e, "code": BACKEND_ERROR}}
+                raise BackendException(code=BACKEND_ERROR,
+                                       message=e,
+                                       response=response)
+
+            if retry < self.retries and method in RETRY_METHODS and \
+                    response.status_code in self.retry_statuses:
+                retry += 1
+                logger.debug("retrying %s %s (%d) after a %d response",
+                             method, endpoint, retry, response.status_code)
+                await asyncio.sleep(self._get_backoff(retry, response))
+                continue
+            return response
+
+    def decode(self, response):
+        """
+        Decodes and returns the response as JSON (dict) or raise BackendException
+        :param response: AsyncResponse object
+        :return: dict
+        """
+
+        # Second stage. Errors are backend errors (bad login, bad url, ...)
+        if response.status_code >= 400:
+            kind = 'Client' if response.status_code < 500 else 'Server'
+            raise BackendException(code=response.status_code,
+                                   message="%d %s Error: %s for url: %s"
+                                   % (response.status_code, kind, response.reason, response.url),
+                                   response=response)
+
+        resp_json = self.codec.loads(response.content)
+        # Catch errors not sent in a HTTP error
+        error = resp_json.get('_error', None)
+        if error:
+            raise BackendException(code=error['code'],
+                                   message=error['message'],
+                                   response=response)
+        return resp_json
+
+    def set_token(self, token):
+        """
+        Set token in authentification for next requests
+        :param token: str. token to set in auth. If None, reinit auth
+        """
+        if token:
+            self._token = token
+            self.authenticated = True
+            logger.debug("Using session token: %s", token)
+        else:
+            self._token = None
+            self.authenticated = False
+            logger.debug("Session token/auth reinitialised")
+
+    def get_token(self):
+        """Get the stored backend token"""
+        return self._token
+
+    token = property(get_token, set_token)
+
+    async def login(self, username, password, generate='enabled', proxies=None):
+        """
+        Log into the backend and get the token
+
+        Same parameters and same behaviour as the `Backend.login` method.
+
+        :param username: login name
+        :type username: str
+        :param password: password
+        :type password: str
+        :param generate: Can have these values: enabled | force | disabled
+        :type generate: str
+        :param proxies: dict of proxy (http and / or https)
+        :type proxies: dict
+        :return: return True if authentication is successfull, otherwise False
+        :rtype: bool
+        """
+        logger.debug("login for: %s with generate: %s", username, generate)
+
+        if not username or not password:
+            raise BackendException(BACKEND_ERROR, "Missing mandatory parameters")
+
+        if proxies:
+            for key in proxies.keys():
+                if key not in PROXY_PROTOCOLS:
+                    raise BackendException(BACKEND_ERROR, "Wrong proxy protocol ", key)
+        self.proxies = proxies
+
+        endpoint = 'login'
+        json = {u'username': username, u'password': password}
+        if generate == 'force':
+            json['action'] = 'generate'
+            logger.debug("Asking for generating new token")
+
+        response = await self.get_response(method='POST', endpoint=endpoint, json=json)
+        if response.status_code == 401:
+            logger.error("Backend refused login with params %s", json)
+            self.set_token(token=None)
+            return False
+
+        resp = self.decode(response=response)
+
+        if 'token' in resp:
+            self.set_token(token=resp['token'])
+            return True
+        if generate == 'force':  # pragma: no cover - need specific backend tests
+            self.set_token(token=None)
+            raise BackendException(BACKEND_ERROR, "Token not provided")
+        if generate == 'disabled':  # pragma: no cover - need specific backend tests
+            logger.error("Token disabled ... to be implemented!")
+            return False
+        if generate == 'enabled':  # pragma: no cover - need specific backend tests
+            logger.warning("Token enabled, but none provided, require new token generation")
+            return await self.login(username, password, 'force')
+
+        return False  # pragma: no cover - unreachable ...
+
+    async def logout(self):
+        """
+        Logout from the backend and close the HTTP session
+
+        :return: return True if logout is successfull, otherwise False
+        :rtype: bool
+        """
+        logger.debug("request backend logout")
+        if not self.authenticated:
+            logger.warning("Unnecessary logout ...")
+            await self.close()
+            return True
+
+        endpoint = 'logout'
+
+        _ = await self.get_response(method='POST', endpoint=endpoint)
+
+        await self.close()
+        self.set_token(token=None)
+
+        return True
+
+    async def get_domains(self):
+        """
+        Connect to alignak backend and retrieve all available child endpoints of root
+
+        :return: list of available resources
+        :rtype: list
+        """
+        resp = await self.get('')
+        if "_links" in resp:
+            _links = resp["_links"]
+            if "child" in _links:
+                return _links["child"]
+
+        return {}  # pragma: no cover - should never occur!
+
+    async def get(self, endpoint, params=None, timeout=None):
+        """
+        Get items or item in alignak backend
+
+        If an error occurs, a BackendException is raised.
+
+        :param endpoint: endpoint (API URL) relative from root endpoint
+        :type endpoint: str
+        :param params: parameters for the backend API
+        :type params: dict
+        :param timeout: request timeout in seconds, or a (connect, read) tuple
+        :type timeout: float or tuple
+        :return: dictionary that always contains: _items and _status
+        :rtype: dict
+        """
+        response = await self.get_response(method='GET', endpoint=endpoint, params=params,
+                                           timeout=timeout)
+
+        resp = self.decode(response=response)
+        if '_status' not in resp:  # pragma: no cover - need specific backend tests
+            resp['_status'] = 'OK'
+
+        if params and 'max_results' in params and '_meta' in resp:
+            # The backend reduces the requested page size to its own limit
+            max_results = int(resp['_meta']['max_results'])
+            if max_results < int(params['max_results']):
+                self._page_sizes[endpoint.split('/')[0]] = max_results
+
+        return resp
+
+    def _get_page_size(self, endpoint):
+        """
+        Get the page size to request for an endpoint when getting all its items
+
+        Same behaviour as the `Backend._get_page_size` method.
+
+        :param endpoint: endpoint (API URL) relative from root endpoint
+        :type endpoint: str
+        :return: page size
+        :rtype: int
+        """
+        page_size = self.page_size or BACKEND_PAGINATION_PROBE
+        limit = self._page_sizes.get(endpoint.split('/')[0])
+        if limit and limit < page_size:
+            return limit
+        return page_size
+
+    async def get_all(self, endpoint, params=None, timeout=None):
+        """
+        Get all items in the specified endpoint of alignak backend
+
+        If an error occurs, a BackendException is raised and the pending pages requests are
+        cancelled.
+
+        The first page is requested to get the total number of items, then all the other pages
+        are requested concurrently. The items are returned in the pages order.
+
+        If the max_results parameter is not specified in parameters, it is set to the
+        endpoint page size (see `_get_page_size`) to limit requests number.
+
+        :param endpoint: endpoint (API URL) relative from root endpoint
+        :type endpoint: str
+        :param params: list of parameters for the backend API
+        :type params: dict
+        :param timeout: timeout of each request in seconds, or a (connect, read) tuple
+        :type timeout: float or tuple
+        :return: dict of properties
+        :rtype: dict
+        """
+        # Set max results at maximum value supported by the backend to limit requests number
+        params = dict(params or {})
+        if 'max_results' not in params:
+            params['max_results'] = self._get_page_size(endpoint)
+
+        # Get first page
+        resp = await self.get(endpoint=endpoint, params=params, timeout=timeout)
+        items = list(resp['_items'])
+        if 'next' not in resp['_links']:
+            return {'_items': items, '_status': 'OK'}
+
+        page = int(resp['_meta']['page'])
+        max_results = int(resp['_meta']['max_results'])
+        number_pages = int(math.ceil(float(resp['_meta']['total']) / float(max_results)))
+
+        tasks = []
+        for next_page in range(page + 1, number_pages + 1):
+            page_params = dict(params, page=next_page, max_results=max_results)
+            tasks.append(asyncio.ensure_future(
+                self.get(endpoint=endpoint, params=page_params, timeout=timeout)))
+        try:
+            responses = await asyncio.gather(*tasks)
+        except BaseException:
+            # Do not leave the other pages requests running
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        for resp in responses:
+            items.extend(resp['_items'])
+
+        return {
+            '_items': items,
+            '_status': 'OK'
+        }
+
+    async def post(self, endpoint, data, headers=None):
+        """
+        Create a new item
+
+        :param endpoint: endpoint (API URL)
+        :type endpoint: str
+        :param data: properties of item to create
+        :type data: dict
+        :param headers: headers (example: Content-Type)
+        :type headers: dict
+        :return: response (creation information)
+        :rtype: dict
+        """
+        response = await self.get_response(method='POST', endpoint=endpoint, json=data,
+                                           headers=headers)
+
+        return self.decode(response=response)
+
+    async def _update(self, method, endpoint, data, headers, inception):
+        # pylint: disable=too-many-arguments
+        """
+        Update (PATCH) or replace (PUT) an item
+
+        :param method: 'PATCH' or 'PUT'
+        :type method: str
+        :return: dictionary containing the backend response
+        :rtype: dict
+        """
+        if not headers:
+            raise BackendException(BACKEND_ERROR,
+                                   "Header If-Match required for %s an object"
+                                   % ('patching' if method == 'PATCH' else 'puting'))
+
+        response = await self.get_response(method=method, endpoint=endpoint, json=data,
+                                           headers=headers)
+
+        if response.status_code == 200:
+            return self.decode(response=response)
+
+        if response.status_code == 412:
+            # 412 means Precondition failed, but confirm ...
+            if inception:
+                # update etag and retry
+                resp = await self.get(endpoint)
+                headers = {'If-Match': resp['_etag']}
+                return await self._update(method, endpoint, data=data, headers=headers,
+                                          inception=False)
+
+            raise BackendException(response.status_code, response.content)
+        else:  # pragma: no cover - should never occur
+            raise BackendException(response.status_code, response.content)
+
+    async def patch(self, endpoint, data, headers=None, inception=False):
+        """
+        Method to update an item
+
+        Same parameters and same behaviour as the `Backend.patch` method.
+
+        :param endpoint: endpoint (API URL)
+        :type endpoint: str
+        :param data: properties of item to update
+        :type data: dict
+        :param headers: headers (example: Content-Type). 'If-Match' required
+        :type headers: dict
+        :param inception: if True tries to get the last _etag
+        :type inception: bool
+        :return: dictionary containing patch response from the backend
+        :rtype: dict
+        """
+        return await self._update('PATCH', endpoint, data, headers, inception)
+
+    async def put(self, endpoint, data, headers=None, inception=False):
+        """
+        Method to replace an item
+
+        Same parameters and same behaviour as the `Backend.put` method.
+
+        :param endpoint: endpoint (API URL)
+        :type endpoint: str
+        :param data: properties of item to update
+        :type data: dict
+        :param headers: headers (example: Content-Type). 'If-Match' required
+        :type headers: dict
+        :param inception: if True tries to get the last _etag
+        :type inception: bool
+        :return: dictionary containing put response from the backend
+        :rtype: dict
+        """
+        return await self._update('PUT', endpoint, data, headers, inception)
+
+    async def delete(self, endpoint, headers):
+        """
+        Method to delete an item or all items
+
+        headers['If-Match'] must contain the _etag identifier of the element to delete
+
+        :param endpoint: endpoint (API URL)
+        :type endpoint: str
+        :param headers: headers (example: Content-Type)
+        :type headers: dict
+        :return: response (deletion information)
+        :rtype: dict
+        """
+        response = await self.get_response(method='DELETE', endpoint=endpoint, headers=headers)
+
+        logger.debug("delete, response: %s", response)
+        if response.status_code != 204:  # pragma: no cover - should not happen ...
+            self.decode(response=response)
+
+        return {"_status": "OK"}
@@ -21,10 +21,10 @@ alignak-backend-cli command line interface::
     Usage:
         alignak-backend-cli [-h]
         alignak-backend-cli [-V]
-        alignak-backend-cli [-v] [-q] [-c] [-l] [-m] [-e] [-i]
+        alignak-backend-cli [-v] [-q] [-c] [-l] [-m] [-e] [-r] [-i]
                             [-b url] [-u username] [-p password]
                             [-d data]
-                            [-f folder]
+                            [-f folder] [-F fields]
                             [-T template] [-t type] [<action>] [<item>]
 
     Options:
@@ -39,10 +39,12 @@ alignak-backend-cli command line interface::
         -p, --password=password     Backend login password [default: admin]
         -d, --data=data             Data for the new item to create [default: none]
         -f, --folder=folder         Folder where to read/write data files [default: none]
+        -F, --fields=fields         Comma separated list of the fields to get [default: none]
         -i, --include-read-data     Do not use only the provided data, but append the one
                                     read from he backend
         -t, --type=host             Type of the provided item [default: host]
         -e, --embedded              Do not embed linked objects
+        -r, --references            Dump the embedded linked objects once and reference them
         -m, --model                 Get only the templates
         -T, --template=template     Template to use for the new item
 
@@ -88,6 +90,9 @@ alignak-backend-cli command line interface::
             alignak-backend-cli list -t user
             Shortcut for 'alignak-backend-cli get -l -t user'
 
+            alignak-backend-cli list -t host -F "name,ls_state,_realm"
+            Try to get the list of all hosts with only their name, live state and realm
+
         Get the hosts templates list from the backend:
             alignak-backend-cli -l -m
             Try to get the list of all hosts templates and copy the JSON dump in a
@@ -173,6 +178,12 @@ alignak-backend-cli command line interface::
         an host, as an example, the result will include the linked check period, contacts,
         check command,... If not used, the result will only include the linked objects identifier.
 
+        When getting a list with the -e option, the linked objects shared by many items (realm,
+        check period, check command,...) are only stored once in memory. Use the -r
+        (--references) option to also dump them only once: the dump file is then an object with
+        the items list in '_items', the items only include the linked objects identifier, and
+        the linked objects, indexed by their identifier, in '_embedded'.
+
         To get the list of all the services of an host, you can get the service list with
         a wildcard in the host name. For all the services of the host named 'passive-01',
         use 'passive-01/*' as in 'alignak-backend-cli get -l -t service passive-01/*'
@@ -200,6 +211,7 @@ import logging
 from docopt import docopt, DocoptExit
 
 from alignak_backend_client.client import Backend, BackendException
+from alignak_backend_client.compact import IdentityMap
 
 # Configure logger
 logging.basicConfig(level=logging.DEBUG,
@@ -214,6 +226,16 @@ __version__ = "1.3.1"
 
 class BackendUpdate(object):  # pylint: disable=useless-object-inheritance
     """Class to interface the Alignak backend to make some operations"""
+    # Number of pages read ahead when getting a list
+    prefetch = 2
+    # Responses cache for the repeated requests (eg. linked items got by name)
+    cache_size = 1000
+    cache_ttl = 60
+    # Number of names searched with a single request when resolving the linked items
+    link_names_chunk = 100
+    # Number of parallel requests when deleting many items
+    delete_concurrency = 8
+
     embedded_resources = {
         'realm': {
             '_parent': 1,
@@ -290,10 +312,28 @@ class BackendUpdate(object):  # pylint: disable=useless-object-inheritance
         }
     }
 
+    # Fields linking to other items and the resource of the linked items
+    # (the templates are items of the same resource)
+    link_fields = {
+        'realm': 'realm', '_realm': 'realm', '_templates': None,
+        'command': 'command', 'host': 'host', 'service': 'service',
+        'escalation_period': 'timeperiod', 'maintenance_period': 'timeperiod',
+        'snapshot_period': 'timeperiod', 'check_period': 'timeperiod',
+        'dependency_period': 'timeperiod', 'notification_period': 'timeperiod',
+        'host_notification_period': 'timeperiod', 'service_notification_period': 'timeperiod',
+        'host_notification_commands': 'command', 'service_notification_commands': 'command',
+        'service_dependencies': 'service', 'users': 'user', 'usergroups': 'usergroup',
+        'check_command': 'command', 'event_handler': 'command',
+        'grafana': 'grafana', 'statsd': 'statsd'
+    }
+
     def __init__(self):
         self.logged_in = False
         self.logged_in_user = None
 
+        # Linked items _id got from their name: (resource, name, template) -> _id or None
+        self.linked_ids = {}
+
         # Get command line parameters
         args = None
         try:
@@ -374,6 +414,14 @@ class BackendUpdate(object):  # pylint: disable=useless-object-inheritance
         # Embedded mode
         self.embedded = args['--embedded']
         logger.debug("Embedded mode: %s", self.embedded)
+        self.references = args['--references']
+        logger.debug("Embedded references mode: %s", self.references)
+
+        # Get only some fields
+        self.fields = None
+        if args['--fields'] != 'none':
+            self.fields = [field.strip() for field in args['--fields'].split(',')]
+        logger.debug("Fields to get: %s", self.fields)
 
         # Get the data files folder
         self.folder = None
@@ -397,7 +445,8 @@ class BackendUpdate(object):  # pylint: disable=useless-object-inheritance
         """
         try:
             logger.info("Authenticating...")
-            self.backend = Backend(self.backend_url)
+            self.backend = Backend(self.backend_url, cache_size=self.cache_size,
+                                   cache_ttl=self.cache_ttl)
             self.backend.login(self.username, self.password)
         except BackendException as exp:  # pragma: no cover, should never happen
             logger.exception("Exception: %s", exp)
@@ -438,7 +487,7 @@ class BackendUpdate(object):  # pylint: disable=useless-object-inheritance
                 self.tp_never = tp['_id']
                 logger.info("Found TP 'Never': %s", self.tp_never)
 
-    def file_dump(self, data, filename):  # pylint: disable=no-self-use
+    def file_dump(self, data, filename):
         """
         Dump the data to a JSON formatted file
         :param data: data to be dumped
@@ -490,38 +539,61 @@ class BackendUpdate(object):  # pylint: disable=useless-object-inheritance
             if self.embedded and resource_name in self.embedded_resources:
                 params.update({'embedded': json.dumps(self.embedded_resources[resource_name])})
 
-            rsp = self.backend.get_all(resource_name, params=params)
-            if rsp['_items'] and rsp['_status'] == 'OK':
-                response = rsp['_items']
+            # Embedded documents shared by the items, and dumped once in references mode
+            documents = IdentityMap()
+            references = {}
 
+            # Process the items while the next pages are downloaded
+            response = []
+            for item in self.backend.iter_all(resource_name, params=params,
+                                              prefetch=self.prefetch, fields=self.fields):
+                response.append(item)
+                if self.dry_run:
+                    continue
+
+                # Filter fields prefixed with an _ (internal backend fields)
+                for field in list(item):
+                    if field in ['_created', '_updated', '_etag', '_links', '_status']:
+                        item.pop(field)
+                        continue
+
+                    # Filter fields prefixed with an _ in embedded items
+                    if self.embedded and resource_name in self.embedded_resources and \
+                            field in self.embedded_resources[resource_name]:
+                        # Embedded items may be a list or a simple dictionary,
+                        # always make it a list
+                        embedded_items = item[field]
+                        if not isinstance(item[field], list):
+                            embedded_items = [item[field]]
+                        for index, embedded_item in enumerate(embedded_items):
+                            if not isinstance(embedded_item, dict):
+                                continue
+                            embedded_id = embedded_item.get('_id')
+                            # Use the same embedded item as the former items
+                            shared_item = documents.canonical(embedded_item)
+                            if shared_item is embedded_item:
+                                # Filter fields in each embedded item, once
+                                for embedded_field in list(embedded_item):
+                                    if embedded_field.startswith('_'):
+                                        embedded_item.pop(embedded_field)
+                                if self.references and embedded_id:
+                                    references[embedded_id] = embedded_item
+                            if self.references and embedded_id:
+                                shared_item = embedded_id
+                            embedded_items[index] = shared_item
+                        if not isinstance(item[field], list):
+                            item[field] = embedded_items[0]
+
+            if response and references:
+                logger.info("-> %d embedded items referenced", len(references))
+                response = {'_items': response, '_embedded': references}
+
+            if response:
                 logger.info("-> found %ss", resource_name)
 
                 # Exists in the backend, we got the element
                 if not self.dry_run:
                     logger.info("-> dumping %ss list", resource_name)
-                    for item in response:
-                        # Filter fields prefixed with an _ (internal backend fields)
-                        for field in list(item):
-                            if field in ['_created', '_updated', '_etag', '_links', '_status']:
-                                item.pop(field)
-                                continue
-
-                            # Filter fields prefixed with an _ in embedded items
-                            if self.embedded and resource_name in self.embedded_resources and \
-                                    field in self.embedded_resources[resource_name]:
-                                # Embedded items may be a list or a simple dictionary,
-                                # always make it a list
-                                embedded_items = item[field]
-                                if not isinstance(item[field], list):
-                                    embedded_items = [item[field]]
-                                # Filter fields in each embedded item
-                                for embedded_item in embedded_items:
-                                    if not embedded_item:
-                                        continue
-                                    for embedded_field in list(embedded_item):
-                                        if embedded_field.startswith('_'):
-                                            embedded_item.pop(embedded_field)
-
                     filename = self.file_dump(response, 'alignak-%s-list-%ss.json'
                                               % ('model' if self.model else 'object',
                                                  resource_name))
@@ -591,7 +663,7 @@ class BackendUpdate(object):  # pylint: disable=useless-object-inheritance
             if self.embedded and resource_name in self.embedded_resources:
                 params.update({'embedded': json.dumps(self.embedded_resources[resource_name])})
 
-            response = self.backend.get(resource_name, params=params)
+            response = self.backend.get(resource_name, params=params, fields=self.fields)
             if response['_items']:
                 response = response['_items'][0]
 
@@ -714,27 +786,23 @@ class BackendUpdate(object):  # pylint: disable=useless-object-inheritance
                         params = {'where': json.dumps({'name': splitted_name[1],
                                                        'host': host['_id']})}
 
-                response = self.backend.get_all(resource_name, params=params)
+                response = self.backend.get_all(resource_name, params=params, fields=['name'])
                 if response['_items']:
                     logger.info("-> found %d matching %s", len(response['_items']), resource_name)
                     for item in response['_items']:
                         logger.info("-> found %s '%s': %s", resource_name, name, item['name'])
 
-                        # Exists in the backend, we must delete the element...
-                        if not self.dry_run:
-                            headers = {
-                                'Content-Type': 'application/json',
-                                'If-Match': item['_etag']
-                            }
-                            logger.info("-> deleting %s: %s", resource_name, item['name'])
-                            self.backend.delete(resource_name + '/' + item['_id'], headers)
-                            logger.info("-> deleted %s: %s", resource_name, item['name'])
-                        else:
-                            response = {'_id': '_fake', '_etag': '_fake'}
-                            logger.info("Dry-run mode: should have deleted an %s '%s'",
-                                        resource_name, name)
-                        logger.info("-> deleted: '%s': %s",
-                                    resource_name, item['_id'])
+                    # Exist in the backend, we must delete the elements...
+                    if not self.dry_run:
+                        if not self._delete_items(resource_name, response['_items']):
+                            print("Deletion error for  '%s' : %s" % (resource_name, name))
+                            print("~~~~~~~~~~~~~~~~~~~~~~~~~~")
+                            print("Exiting with error code: 5")
+                            return False
+                    else:
+                        response = {'_id': '_fake', '_etag': '_fake'}
+                        logger.info("Dry-run mode: should have deleted an %s '%s'",
+                                    resource_name, name)
                 else:
                     logger.warning("-> %s item '%s' not found", resource_name, name)
                     return False
@@ -748,6 +816,133 @@ class BackendUpdate(object):  # pylint: disable=useless-object-inheritance
 
         return True
 
+    def _delete_items(self, resource_name, items):
+        """Delete the found items of a resource and report each deletion result
+
+        :param resource_name: backend resource endpoint (eg. host, user, ...)
+        :param items: list of the items to delete, with their _id, _etag and name
+        :return: True if all the items are deleted, else False
+        """
+        logger.info("-> deleting %d %s", len(items), resource_name)
+        results = self.backend.delete_many(
+            [(resource_name + '/' + item['_id'], item['_etag']) for item in items],
+            concurrency=self.delete_concurrency)
+        deleted = True
+        for item, result in zip(items, results):
+            if result['_status'] != 'OK':
+                logger.error("-> %s '%s' deletion failed: %s",
+                             resource_name, item['name'], result['_error'])
+                deleted = False
+                continue
+            logger.info("-> deleted: '%s': %s", resource_name, item['_id'])
+        return deleted
+
+    def get_linked_id(self, resource_name, name, template=False):
+        """Get the _id of a linked item from its name
+
+        The found _id, or the missing item, is remembered for the next items of the run
+
+        :param resource_name: backend resource endpoint (eg. timeperiod, command, ...)
+        :param name: name of the linked item
+        :param template: True to get a template
+        :return: the item _id, or None if no item is found
+        """
+        key = (resource_name, name, template)
+        if key not in self.linked_ids:
+            search = {'name': name}
+            if template:
+                search['_is_template'] = True
+            logger.debug(" - %s, search: %s", resource_name, search)
+            response = self.backend.get(resource_name, params={'where': json.dumps(search)})
+            self.linked_ids[key] = None
+            if response['_items']:
+                self.linked_ids[key] = response['_items'][0]['_id']
+        return self.linked_ids[key]
+
+    def resolve_linked_ids(self, resource_name, json_data):
+        """Get the _id of all the linked items named in the provided data
+
+        All the names linked to the same resource are searched with a few requests
+        instead of one request per item and per field. The found _id, and the missing items,
+        are remembered as by the `get_linked_id` function.
+
+        :param resource_name: backend resource endpoint of the provided data (eg. host, ...)
+        :param json_data: list of the items data
+        :return: None
+        """
+        searched = self._get_linked_names(resource_name, json_data)
+        for (linked_resource, template), names in searched.items():
+            self._search_linked_ids(linked_resource, sorted(names), template)
+
+    def _get_linked_names(self, resource_name, json_data):
+        """Get the names of the linked items that are not yet known in the provided data
+
+        :param resource_name: backend resource endpoint of the provided data (eg. host, ...)
+        :param json_data: list of the items data
+        :return: names to search, per (linked resource, template) tuple
+        :rtype: dict
+        """
+        searched = {}
+        for json_item in json_data:
+            for field in json_item:
+                if field not in self.link_fields:
+                    continue
+                key = (self.link_fields[field], False)
+                if field in ['_templates']:
+                    key = (resource_name, True)
+
+                field_values = json_item[field]
+                if not isinstance(field_values, list):
+                    field_values = [field_values]
+                for value in field_values:
+                    try:
+                        int(value, 16)
+                    except TypeError:
+                        pass
+                    except ValueError:
+                        if (key[0], value, key[1]) not in self.linked_ids:
+                            searched.setdefault(key, set()).add(value)
+        return searched
+
+    def _search_linked_ids(self, linked_resource, names, template):
+        """Search the _id of the named linked items with batched `$in` requests
+
+        :param linked_resource: backend resource endpoint of the linked items
+        :param names: list of the names to search
+        :param template: True to search templates
+        :return: None
+        """
+        for index in range(0, len(names), self.link_names_chunk):
+            chunk = names[index:index + self.link_names_chunk]
+            search = {'name': {'$in': chunk}}
+            if template:
+                search['_is_template'] = True
+            logger.debug(" - %s, search: %s", linked_resource, search)
+            try:
+                response = self.backend.get_all(linked_resource,
+                                                params={'where': json.dumps(search)},
+                                                fields=['name'])
+            except BackendException as exp:
+                # Let the items search their linked items one by one
+                logger.warning("Linked %s search failed: %s", linked_resource, exp)
+                continue
+
+            for item in response['_items']:
+                self.linked_ids.setdefault((linked_resource, item['name'], template),
+                                           item['_id'])
+            for name in chunk:
+                self.linked_ids.setdefault((linked_resource, name, template), None)
+
+    def forget_linked_id(self, resource_name, name):
+        """Forget the _id of a linked item that is created or updated
+
+        :param resource_name: backend resource endpoint (eg. timeperiod, command, ...)
+        :param name: name of the item
+        :return: None
+        """
+        self.linked_ids.pop((resource_name, name, False), None)
+        self.linked_ids.pop((resource_name, name, True), None)
+
     def create_update_resource(self, resource_name, name, update=False):
         # pylint: disable=too-many-return-statements, too-many-locals
         # pylint: disable=too-many-nested-blocks
@@ -813,6 +1008,8 @@ class BackendUpdate(object):  # pylint: disable=useless-object-inheritance
                 json_data = [json_data]
 
             logger.info("Got %d %ss", len(json_data), resource_name)
+            self.resolve_linked_ids(resource_name, json_data)
+
             count = 0
             for json_item in json_data:
                 logger.info("-> json item: %s", json_item)
@@ -876,7 +1073,8 @@ class BackendUpdate(object):  # pylint: disable=useless-object-inheritance
                 if name:
                     logger.info("Trying to get %s: '%s', params: %s",
                                 resource_name, item_name, params)
-                    response = self.backend.get(resource_name, params=params)
+                    # Always get the current item _etag
+                    response = self.backend.get(resource_name, params=params, cache=False)
                     if response['_items']:
                         found_item = response['_items'][0]
                         found_id = found_item['_id']
@@ -924,15 +1122,7 @@ class BackendUpdate(object):  # pylint: disable=useless-object-inheritance
                         continue
 
                     # Manage potential object link fields
-                    if field not in ['realm', '_realm', '_templates',
-                                     'command', 'host', 'service',
-                                     'escalation_period', 'maintenance_period',
-                                     'snapshot_period', 'check_period', 'dependency_period',
-                                     'notification_period', 'host_notification_period',
-                                     'escalation_period', 'service_notification_period',
-                                     'host_notification_commands', 'service_notification_commands',
-                                     'service_dependencies', 'users', 'usergroups',
-                                     'check_command', 'event_handler', 'grafana', 'statsd']:
+                    if field not in self.link_fields:
                         continue
 
                     field_values = item_data[field]
@@ -945,54 +1135,25 @@ class BackendUpdate(object):  # pylint: disable=useless-object-inheritance
                         try:
                             int(value, 16)
                             logger.debug(" - %s, uuid value: %s", field, value)
-
-                            if not isinstance(item_data[field], list):
-                                found = value
-                            else:
-                                if found is None:
-                                    found = []
-                                found.append(value)
+                            linked_id = value
                         except TypeError:
-                            pass
+                            continue
                         except ValueError:
                             # Not an integer, consider an item name
-                            field_params = {'where': json.dumps({'name': value})}
-                            logger.debug(" - %s, params: %s", field, field_params)
-                            if field in ['escalation_period', 'maintenance_period',
-                                         'snapshot_period', 'check_period',
-                                         'dependency_period', 'notification_period',
-                                         'host_notification_period',
-                                         'service_notification_period']:
-                                response2 = self.backend.get('timeperiod', params=field_params)
-                            elif field in ['_realm']:
-                                response2 = self.backend.get('realm', params=field_params)
-                            elif field in ['service_dependencies']:
-                                response2 = self.backend.get('service', params=field_params)
-                            elif field in ['users']:
-                                response2 = self.backend.get('user', params=field_params)
-                            elif field in ['usergroups']:
-                                response2 = self.backend.get('usergroup', params=field_params)
-                            elif field in ['check_command', 'event_handler',
-                                           'service_notification_commands',
-                                           'host_notification_commands']:
-                                response2 = self.backend.get('command', params=field_params)
-                            elif field in ['_templates']:
-                                field_params = {'where': json.dumps({'name': value,
-                                                                     '_is_template': True})}
-                                response2 = self.backend.get(resource_name, params=field_params)
+                            if field in ['_templates']:
+                                linked_id = self.get_linked_id(resource_name, value, template=True)
                             else:
-                                response2 = self.backend.get(field, params=field_params)
-
-                            if response2['_items']:
-                                response2 = response2['_items'][0]
-                                logger.info("Replaced %s = %s with found item _id",
-                                            field, value)
-                                if not isinstance(item_data[field], list):
-                                    found = response2['_id']
-                                else:
-                                    if found is None:
-                                        found = []
-                                    found.append(response2['_id'])
+                                linked_id = self.get_linked_id(self.link_fields[field], value)
+                            if linked_id is None:
+                                continue
+                            logger.info("Replaced %s = %s with found item _id", field, value)
+
+                        if not isinstance(item_data[field], list):
+                            found = linked_id
+                        else:
+                            if found is None:
+                                found = []
+                            found.append(linked_id)
 
                     if found is None:
                         logger.warning("Not found %s = %s, removing field!", field, field_values)
@@ -1053,6 +1214,10 @@ class BackendUpdate(object):  # pylint: disable=useless-object-inheritance
                     logger.warning("Response: %s", response)
                     return False
 
+                if not self.dry_run:
+                    # The linked items of the next items may be this one
+                    self.forget_linked_id(resource_name, item_name)
+
                 if not update:
                     # Created a new element
                     if not self.dry_run:
@@ -1111,6 +1276,9 @@ def main():
     if bc.action == 'delete':
         success = bc.delete_resource(bc.item_type, bc.item)
 
+    # Stop the parallel requests workers
+    bc.backend.close_pool()
+
     if not success:
         logger.error("%s '%s' %s failed", bc.item_type, bc.item, bc.action)
         if not bc.verbose:
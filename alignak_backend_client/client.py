@@ -34,20 +34,39 @@
 
     The Alignak backend data model is `documented here <http://alignak-backend.readthedocs.io/>`_.
 """
+import json as stdjson
 import logging
 from logging import getLogger
 
 import math
 import multiprocessing
+import random
+from multiprocessing.pool import ThreadPool
+import threading
+import time
+import zlib
+from collections import OrderedDict
 
 from future.moves.urllib.parse import urljoin
+from future.moves.queue import Queue, Empty, Full
 
 import requests
 from requests import RequestException
 from requests.auth import HTTPBasicAuth
-from requests.adapters import HTTPAdapter
+from requests.adapters import HTTPAdapter, DEFAULT_POOLSIZE
 # from requests.packages.urllib3 import Retry
+from urllib3.exceptions import HTTPError
 from urllib3.util import Retry
+from urllib3.util.request import ACCEPT_ENCODING
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - optional dependency
+    ijson = None
+
+from alignak_backend_client.codec import get_codec, Interner
+from alignak_backend_client.compact import CompactItems
+from alignak_backend_client.metrics import MetricsCollector
 
 logger = getLogger(__name__)
 # Check if logger has already handler to prevent override it
@@ -65,12 +84,40 @@ getLogger("urllib3").setLevel('WARNING')
 # Define pagination limits according to backend's ones!
 BACKEND_PAGINATION_LIMIT = 50
 BACKEND_PAGINATION_DEFAULT = 25
+# Page size requested to discover the backend maximum page size
+BACKEND_PAGINATION_PROBE = 5000
+# Number of items sent with a single request by the bulk functions
+BACKEND_BULK_SIZE = 100
+# Maximum number of responses kept for the conditional requests
+ETAG_CACHE_SIZE = 1000
+# Bytes read at once from a streamed response, before decompression. The compressed responses
+# are up to 30 times larger once decompressed
+STREAM_BUFFER_SIZE = 8192
 
 # Proxy protocols
 PROXY_PROTOCOLS = ['http', 'https']
 
 # Connection error code
 BACKEND_ERROR = 1000
+# Deadline exceeded error code
+BACKEND_TIMEOUT = 1001
+# Circuit breaker open error code
+BACKEND_UNAVAILABLE = 1002
+
+# Requests retried on a read error or on a retry status. The other requests are only retried
+# on a connection error, when they did not reach the backend. The PATCH requests are retried
+# because the backend refuses their If-Match _etag (412) if they were already applied
+RETRY_METHODS = ['HEAD', 'GET', 'PUT', 'PATCH', 'DELETE', 'OPTIONS']
+# Response status codes retried
+RETRY_STATUSES = [502, 503, 504]
+
+# Executors used to get the pages in parallel
+EXECUTOR_PROCESS = 'process'
+EXECUTOR_THREAD = 'thread'
+
+# Pagination strategies
+PAGINATION_PAGE = 'page'
+PAGINATION_KEYSET = 'keyset'
 
 
 class BackendException(Exception):
@@ -82,6 +129,8 @@ class BackendException(Exception):
     Defined error codes:
 
     - 1000: first stage error, exception raising between the client and the backend when connecting
+    - 1001: the deadline of an operation requesting several pages (eg. get_all) is exceeded
+    - 1002: the backend is considered as unavailable after repeated failures (circuit breaker)
     - <1000: second stage error. Connection between client and backend is ok,
     but the backend returns errors on
     requests
@@ -106,45 +155,833 @@ class BackendException(Exception):
                " {1} - {2}".format(self.code, self.message, self.response)
 
 
+class BackendRetry(Retry):
+    """
+    Requests retry policy
+
+    The backoff time is randomly reduced by up to `jitter` (0 to 1) of its value, so that many
+    clients do not retry at the same time. The Retry-After header of the backend responses is
+    respected.
+
+    No request is retried nor waits after the deadline of the operation running in the current
+    thread. The deadline is the `expiry` time (as returned by time.time) of the `deadline` thread
+    local storage, None when the operation has no deadline.
+    """
+    deadline = threading.local()
+
+    def __init__(self, jitter=0, **kwargs):
+        super(BackendRetry, self).__init__(**kwargs)
+        self.jitter = jitter
+
+    def new(self, **kwargs):
+        kwargs.setdefault('jitter', self.jitter)
+        return super(BackendRetry, self).new(**kwargs)
+
+    def get_remaining(self):
+        """
+        Get the time left before the deadline of the current thread operation
+
+        :return: remaining seconds, None if the operation has no deadline
+        :rtype: float
+        """
+        expiry = getattr(self.deadline, 'expiry', None)
+        if expiry is None:
+            return None
+        return expiry - time.time()
+
+    def is_exhausted(self):
+        remaining = self.get_remaining()
+        if remaining is not None and remaining <= 0:
+            return True
+        return super(BackendRetry, self).is_exhausted()
+
+    def get_backoff_time(self):
+        backoff = super(BackendRetry, self).get_backoff_time()
+        if backoff and self.jitter:
+            backoff *= 1 - self.jitter * random.random()
+        remaining = self.get_remaining()
+        if remaining is not None:
+            backoff = max(min(backoff, remaining), 0)
+        return backoff
+
+    def get_retry_after(self, response):
+        retry_after = super(BackendRetry, self).get_retry_after(response)
+        remaining = self.get_remaining()
+        if retry_after is not None and remaining is not None:
+            retry_after = max(min(retry_after, remaining), 0)
+        return retry_after
+
+
+class CircuitBreaker(object):  # pylint: disable=useless-object-inheritance
+    """
+    Circuit breaker of the backend requests
+
+    After `threshold` consecutive failed requests, the circuit is open: the requests fail
+    immediately, without reaching the backend. After `cooldown` seconds, a single request probes
+    the backend. The circuit is closed if it succeeds, else it is open again. Another request
+    probes the backend if the probe result is not recorded within `cooldown` seconds.
+
+    A failed request is a request that did not get a response or got a 5xx response. The
+    result of a streamed request is recorded once its items are read (see `ItemsStream`).
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, threshold, cooldown):
+        """
+        Initialize a closed circuit
+
+        :param threshold: number of consecutive failed requests opening the circuit
+        :type threshold: int
+        :param cooldown: time before probing the backend, in seconds
+        :type cooldown: float
+        """
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Check if a request may be sent to the backend
+
+        :return: True if the circuit is closed or if the request probes the backend
+        :rtype: bool
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            # A probe that did not record its result is lost after the cool-down
+            if time.time() >= self._opened + self.cooldown:
+                logger.info("probing the backend")
+                self.state = self.HALF_OPEN
+                self._opened = time.time()
+                return True
+            return False
+
+    def success(self):
+        """
+        Record a successful request
+
+        :return: None
+        """
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.warning("backend available, circuit closed")
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def failure(self):
+        """
+        Record a failed request
+
+        :return: None
+        """
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                if self.state != self.OPEN:
+                    logger.warning("backend unavailable after %d failures, circuit open for %ss",
+                                   self.failures, self.cooldown)
+                self.state = self.OPEN
+                self._opened = time.time()
+
+    def reset_lock(self):
+        """
+        Get a new lock, in a forked process (see `Backend._init_process`)
+
+        :return: None
+        """
+        self._lock = threading.Lock()
+
+
+class ResponseCache(object):  # pylint: disable=useless-object-inheritance
+    """
+    Bounded responses cache
+
+    Responses are stored with the key provided by `Backend._get_cache_key` and they expire after
+    `ttl` seconds. When more than `size` responses are stored, the least recently used ones are
+    discarded.
+    """
+    def __init__(self, size, ttl):
+        """
+        Initialize an empty cache
+
+        :param size: maximum number of stored responses
+        :type size: int
+        :param ttl: time to live of a stored response, in seconds
+        :type ttl: float
+        """
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Get a stored response
+
+        :param key: request key
+        :type key: tuple
+        :return: the response content or None if it is not stored or expired
+        :rtype: bytes
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                return None
+            # Most recently used
+            self._entries[key] = entry
+            return entry[1]
+
+    def set(self, key, content):
+        """
+        Store a response
+
+        :param key: request key
+        :type key: tuple
+        :param content: response content
+        :type content: bytes
+        :return: None
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time() + self.ttl, content)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        """
+        Remove a stored response, if any
+
+        :param key: request key
+        :type key: tuple
+        :return: None
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate(self, resource=None):
+        """
+        Remove the stored responses of a resource, or all the stored responses
+
+        :param resource: resource name (eg. host), None for all the resources
+        :type resource: str
+        :return: None
+        """
+        with self._lock:
+            if resource is None:
+                self._entries.clear()
+                return
+            for key in list(self._entries):
+                if key[0].split('/')[0] == resource:
+                    del self._entries[key]
+
+    def reset_lock(self):
+        """
+        Get a new lock, in a forked process (see `Backend._init_process`)
+
+        :return: None
+        """
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ItemsStream(object):  # pylint: disable=useless-object-inheritance
+    """
+    Items of a backend response, decoded one by one while the response is read
+
+    Iterating yields the items of the response `_items` list without keeping the response
+    content in memory. The other fields of the response (_links, _meta, ...) are stored in the
+    response dictionary as they are read, after the items for an Eve backend. The `last` read
+    item and the `count` of read items are kept.
+
+    The response is closed when the iteration ends. Iterating again continues from the next
+    unread item, and `drain` reads the items that were not iterated.
+
+    A connection error or a malformed content while the response is read raises a
+    BackendException with code BACKEND_ERROR, or BACKEND_TIMEOUT once the `expiry` time of the
+    operation is passed. The client circuit breaker records the result of the request when the
+    iteration ends.
+    """
+    def __init__(self, backend, endpoint, response, resp, expiry=None, interner=None):
+        # pylint: disable=too-many-arguments
+        """
+        Initialize the items stream of a response
+
+        :param backend: client that got the response
+        :type backend: Backend
+        :param endpoint: requested endpoint
+        :type endpoint: str
+        :param response: streamed response
+        :type response: requests.Response
+        :param resp: response dictionary, updated with the other fields of the response
+        :type resp: dict
+        :param expiry: time when the operation must be finished (see `BackendRetry`)
+        :type expiry: float
+        :param interner: interner of the items keys and values
+        :type interner: Interner
+        """
+        self.backend = backend
+        self.endpoint = endpoint
+        self.response = response
+        self.resp = resp
+        self.expiry = expiry
+        self.interner = interner
+        self.last = None
+        self.count = 0
+        self.size = 0
+        self._start = time.time() - response.elapsed.total_seconds()
+        self._items = None
+
+    def read(self, size=-1):
+        """
+        Read the decompressed response content, for the JSON parser
+
+        :param size: maximum number of bytes to read
+        :type size: int
+        :return: response content
+        :rtype: bytes
+        """
+        data = self.response.raw.read(size if size >= 0 else None)
+        self.size += len(data)
+        return data
+
+    def __iter__(self):
+        if self._items is None:
+            self._items = self._iter_items()
+        return self._items
+
+    def drain(self):
+        """
+        Read the items that were not iterated, so that the other fields of the response are
+        stored in the response dictionary
+
+        :return: None
+        """
+        for _ in self:
+            pass
+
+    def _iter_items(self):
+        """
+        Decode the items while the response is read
+
+        :return: generator of the items
+        """
+        self.response.raw.decode_content = True
+        builder = None
+        path = None
+        failed = False
+        try:
+            events = ijson.parse(self, buf_size=STREAM_BUFFER_SIZE, use_float=True)
+            for prefix, event, value in events:
+                if builder is not None:
+                    builder.event(event, value)
+                    if prefix != path or event not in ['end_map', 'end_array']:
+                        continue
+                    if path == '_items.item':
+                        self.last = builder.value
+                        if self.interner is not None:
+                            self.last = self.interner.intern(self.last)
+                        self.count += 1
+                        builder = None
+                        yield self.last
+                    else:
+                        self.resp[path] = builder.value
+                        builder = None
+                    continue
+
+                item = prefix == '_items.item'
+                field = prefix not in ['', '_items'] and '.' not in prefix
+                if item or field:
+                    if event in ['start_map', 'start_array']:
+                        builder = ijson.ObjectBuilder()
+                        builder.event(event, value)
+                        path = prefix
+                    elif event != 'map_key':
+                        self.resp[prefix] = value
+        except (HTTPError, ijson.JSONError) as exp:
+            failed = True
+            raise self._get_exception(exp)
+        finally:
+            self.response.close()
+            if not failed:
+                if self.backend.breaker is not None:
+                    self.backend.breaker.success()
+                # pylint: disable=protected-access
+                self.backend._count_stream(self.endpoint, self.response, self.size,
+                                           time.time() - self._start)
+
+        error = self.resp.get('_error', None)
+        if error:
+            raise BackendException(code=error['code'], message=error['message'],
+                                   response=self.resp)
+
+    def _get_exception(self, exception):
+        """
+        Get the BackendException of an error raised while the response is read
+
+        The error hooks are called and the circuit breaker records a failure, as for a request
+        that did not get a response.
+
+        :param exception: raised connection or decoding error
+        :type exception: Exception
+        :return: exception to raise
+        :rtype: BackendException
+        """
+        if self.expiry is not None and time.time() >= self.expiry:
+            exp = BackendException(BACKEND_TIMEOUT,
+                                   "Deadline exceeded getting %s" % self.endpoint)
+        else:
+            response = {"_status": "ERR",
+                        "_error": {"message": exception, "code": BACKEND_ERROR},
+                        "_issues": {"message": exception, "code": BACKEND_ERROR}}
+            exp = BackendException(code=BACKEND_ERROR, message=exception, response=response)
+        if self.backend.breaker is not None:
+            self.backend.breaker.failure()
+        # pylint: disable=protected-access
+        self.backend._call_hooks('on_error', 'GET', self.endpoint, 0, exp,
+                                 time.time() - self._start)
+        return exp
+
+
 class Backend(object):  # pylint: disable=useless-object-inheritance
     """
     Backend client class to communicate with an Alignak backend
 
     Provide the backend endpoint URL to initialize the client (eg. http://127.0.0.1:5000)
 
+    When more than one process is required, the `get_all` function gets the pages in parallel
+    with the configured executor:
+
+    - EXECUTOR_PROCESS (default): the pages are shared between forked processes
+    - EXECUTOR_THREAD: the pages are shared between the threads of a pool. Each thread uses its
+      own HTTP session and the pool is kept alive until the logout. This executor is best suited
+      for the I/O bound page requests.
+
+    When getting all the items of an endpoint, the client requests pages as large as the
+    backend accepts. The backend silently reduces a too large `max_results` to its own
+    pagination limit; the client then remembers this limit for the endpoint. Set `page_size`
+    to request smaller pages, else the first request for an endpoint probes the limit with
+    BACKEND_PAGINATION_PROBE.
+
+    The pagination strategy defines how the pages are requested:
+
+    - PAGINATION_PAGE (default): pages are requested by number. The backend skips all the
+      previous items for each page, so the deeper pages are slower to get, and the pages
+      may drift if items are inserted or deleted during the scan.
+    - PAGINATION_KEYSET: items are sorted by _id and each page requests the items which _id is
+      greater than the last one got. All the pages cost the same. For parallel scans, the _id
+      range is split in as many ranges as processes, each one being scanned by keyset.
+
+    If `etag_cache` is True, the `get` function keeps the last response got for each endpoint
+    and parameters along with its ETag. The next same request is a conditional request
+    (If-None-Match) and the kept response is used if the backend replies 304 Not Modified.
+    Up to ETAG_CACHE_SIZE responses are kept, the least recently used ones are discarded, and
+    they are all dropped when the token changes.
+
+    If `cache_size` is set, the `get` function keeps up to `cache_size` responses in memory for
+    `cache_ttl` seconds and the same requests do not reach the backend. The cached responses of
+    a resource are dropped when the client posts, patches, puts or deletes on this resource.
+    Items changed by other backend clients may be seen late, up to `cache_ttl` seconds. The
+    pages got by `get_all` and `iter_all` are not cached.
+
+    The requests body and the responses are encoded and decoded with the fastest installed
+    JSON library (orjson, ujson or the Python json module). Set `codec` to force one of them.
+    If `intern` is True, the equal keys and the equal values of the `intern_fields` (links to
+    other items and states, see alignak_backend_client.codec.INTERN_FIELDS) of the items decoded
+    by a call are shared in memory rather than being decoded again for each item. This reduces
+    the memory used by large results, for a slower decoding. Each call uses a new interner, so
+    that the client does not keep the shared values once the call is finished.
+
+    `get_all` may join the linked documents to the items on the client side rather than
+    requesting the backend to embed them (see `_join_items`).
+
+    The client accepts compressed responses (gzip, deflate, and br or zstd when the brotli or
+    zstandard libraries are installed). If `compress_threshold` is set, the requests body
+    larger than this number of bytes are sent gzip compressed; the backend (or its front
+    HTTP server) must then accept the compressed requests. See `stats`.
+
+    Each HTTP session keeps up to `pool_maxsize` connections open to the backend, as many as
+    the client processes by default, so that the connections are reused by the concurrent
+    requests. See `stats`.
+
+    The `connect_timeout` and `read_timeout` apply to each request, unless a `timeout` is
+    provided for a call. Without them, a request to an unresponsive backend waits forever.
+
+    The requests are retried up to `retries` times on a connection error. The RETRY_METHODS
+    requests are also retried on a read error and on the `retry_statuses` responses, but not the
+    POST requests which could create the items twice. A retried PATCH request that was already
+    applied fails with a 412 error because its _etag changed. The retries wait for an
+    exponential backoff (`retry_backoff` * 2^retries seconds), randomly reduced by up to
+    `retry_jitter`, or for the Retry-After delay of the backend response.
+
+    If `breaker_threshold` is set, the client stops requesting the backend after this number of
+    consecutive failed requests and raises a BackendException with code BACKEND_UNAVAILABLE
+    rather than waiting for the backend. After `breaker_cooldown` seconds, a request probes the
+    backend again (see `CircuitBreaker`).
+
+    The `hooks` are notified before each request and after its response or failure. Append
+    or remove the hooks of the `hooks` list to register or unregister them. Unless `metrics` is
+    False, a `MetricsCollector` records the latency, the status codes, the bytes and the retries
+    of the requests. See `stats`.
+
     """
-    def __init__(self, endpoint, processes=1):
+    def __init__(self, endpoint, processes=1, executor=EXECUTOR_PROCESS, page_size=None,
+                 pagination=PAGINATION_PAGE, etag_cache=False, cache_size=0, cache_ttl=60,
+                 codec=None, compress_threshold=0, pool_connections=None, pool_maxsize=None,
+                 pool_block=False, connect_timeout=None, read_timeout=None, retries=5,
+                 retry_backoff=0.1, retry_jitter=0.5, retry_statuses=None, breaker_threshold=0,
+                 breaker_cooldown=30, hooks=None, metrics=True, intern=False, intern_fields=None):
+        # pylint: disable=too-many-arguments,too-many-locals
         """
         Initialize a client connection
 
         :param endpoint: root endpoint (API URL)
         :type endpoint: str
+        :param processes: number of processes (or threads) used to get all the items
+        :type processes: int
+        :param executor: EXECUTOR_PROCESS or EXECUTOR_THREAD
+        :type executor: str
+        :param page_size: page size requested when getting all items (default is the backend
+        pagination limit)
+        :type page_size: int
+        :param pagination: PAGINATION_PAGE or PAGINATION_KEYSET
+        :type pagination: str
+        :param etag_cache: True to use conditional requests for the already got items
+        :type etag_cache: bool
+        :param cache_size: maximum number of responses kept in memory, 0 to disable the cache
+        :type cache_size: int
+        :param cache_ttl: time to live of the responses kept in memory, in seconds
+        :type cache_ttl: float
+        :param codec: JSON codec name (orjson, ujson or json), default is the fastest installed
+        :type codec: str
+        :param compress_threshold: minimum size of the gzip compressed requests body, in bytes,
+        0 to never compress the requests body
+        :type compress_threshold: int
+        :param pool_connections: number of connection pools (one per host) of a session
+        :type pool_connections: int
+        :param pool_maxsize: maximum number of connections kept open to the backend by a session,
+        default is the number of processes (at least 10)
+        :type pool_maxsize: int
+        :param pool_block: True to wait for a free connection rather than opening a new one
+        when pool_maxsize connections are used
+        :type pool_block: bool
+        :param connect_timeout: time to wait for the connection to the backend, in seconds
+        :type connect_timeout: float
+        :param read_timeout: time to wait for the backend response data, in seconds
+        :type read_timeout: float
+        :param retries: maximum number of retries of a request
+        :type retries: int
+        :param retry_backoff: backoff factor of the retries, in seconds
+        :type retry_backoff: float
+        :param retry_jitter: part of the backoff time randomly removed (0 to 1)
+        :type retry_jitter: float
+        :param retry_statuses: retried response status codes, default is RETRY_STATUSES
+        :type retry_statuses: list
+        :param breaker_threshold: number of consecutive failed requests before failing fast,
+        0 to disable the circuit breaker
+        :type breaker_threshold: int
+        :param breaker_cooldown: time before requesting the backend again, in seconds
+        :type breaker_cooldown: float
+        :param hooks: requests hooks (see alignak_backend_client.metrics.RequestHooks)
+        :type hooks: list
+        :param metrics: False to disable the requests metrics collector
+        :type metrics: bool
+        :param intern: True to share the equal keys and values of the decoded items
+        :type intern: bool
+        :param intern_fields: names of the fields which values are shared, default is
+        alignak_backend_client.codec.INTERN_FIELDS
+        :type intern_fields: list
         """
+        if executor not in [EXECUTOR_PROCESS, EXECUTOR_THREAD]:
+            raise BackendException(BACKEND_ERROR, "Unknown executor: %s" % executor)
+        if pagination not in [PAGINATION_PAGE, PAGINATION_KEYSET]:
+            raise BackendException(BACKEND_ERROR, "Unknown pagination: %s" % pagination)
+        self.codec = get_codec(codec)
+        if self.codec is None:
+            raise BackendException(BACKEND_ERROR, "Unavailable JSON codec: %s" % codec)
+        # Keys and values shared by the items decoded by a call, see _get_interner
+        self.intern = intern
+        self.intern_fields = intern_fields
+
         self.processes = processes
+        self.executor = executor
+        self.pagination = pagination
+
+        # Requested page size and discovered backend page size limit per endpoint
+        self.page_size = page_size
+        self._page_sizes = {}
+
+        # Conditional requests cache: (endpoint, params) -> (etag, response content). The
+        # entries do not expire, the backend tells if they are still valid
+        self._etags = ResponseCache(ETAG_CACHE_SIZE, float('inf')) if etag_cache else None
+
+        # Responses cache: (endpoint, params) -> response content
+        self._cache = ResponseCache(cache_size, cache_ttl) if cache_size else None
+
+        # Requests body compression and compression statistics
+        self.compress_threshold = compress_threshold
+        self._compression = {'requests': [0, 0, 0], 'responses': [0, 0, 0]}
+        self._stats_lock = threading.Lock()
+
+        # HTTP connection pools of the sessions and connections statistics of the closed sessions
+        self.pool_connections = pool_connections or DEFAULT_POOLSIZE
+        self.pool_maxsize = pool_maxsize or max(processes, DEFAULT_POOLSIZE)
+        self.pool_block = pool_block
+        self._connections = [0, 0]
+
+        # Requests retry policy and circuit breaker
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.retry_jitter = retry_jitter
+        self.retry_statuses = RETRY_STATUSES if retry_statuses is None else retry_statuses
+        self.breaker = None
+        if breaker_threshold:
+            self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+
+        # Requests hooks, starting with the metrics collector
+        self.metrics = MetricsCollector() if metrics else None
+        self.hooks = [self.metrics] if metrics else []
+        self.hooks.extend(hooks or [])
+
         if endpoint.endswith('/'):  # pragma: no cover - test url is complying ...
             self.url_endpoint_root = endpoint[0:-1]
         else:
             self.url_endpoint_root = endpoint
 
-        self.session = requests.Session()
-        self.session.header = {'Content-Type': 'application/json'}
+        self.session = self._new_session()
 
-        # Needed for retrying requests (104 - Connection reset by peer for example)
-        methods = ['POST', 'HEAD', 'GET', 'PUT', 'DELETE', 'PATCH']
-        http_retry = Retry(total=5, connect=5, read=5, backoff_factor=0.1,
-                           method_whitelist=methods)
-        https_retry = Retry(total=5, connect=5, read=5, backoff_factor=0.1,
-                            method_whitelist=methods)
-        http_adapter = HTTPAdapter(max_retries=http_retry)
-        https_adapter = HTTPAdapter(max_retries=https_retry)
-        self.session.mount('http://', http_adapter)
-        self.session.mount('https://', https_adapter)
+        # Thread pools (per size) and HTTP sessions of their workers
+        self._local = threading.local()
+        self._pools = {}
+        self._pool_sessions = []
+        self._pool_lock = threading.Lock()
 
         self.authenticated = False
         self._token = None
         self.proxies = None
 
-        self.timeout = None  # TODO: Add this option in config file
+        # Requests timeout, as accepted by Requests: None or (connect, read) timeouts
+        self.timeout = None
+        if connect_timeout is not None or read_timeout is not None:
+            self.timeout = (connect_timeout, read_timeout)
+
+    def _new_session(self):
+        """
+        Create a new HTTP session
+
+        :return: requests.Session
+        """
+        session = requests.Session()
+        session.header = {'Content-Type': 'application/json'}
+        # All the compressions that urllib3 is able to decode
+        session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+
+        # Needed for retrying requests (104 - Connection reset by peer for example)
+        http_retry = self._new_retry()
+        https_retry = self._new_retry()
+        http_adapter = HTTPAdapter(max_retries=http_retry, pool_connections=self.pool_connections,
+                                   pool_maxsize=self.pool_maxsize, pool_block=self.pool_block)
+        https_adapter = HTTPAdapter(max_retries=https_retry,
+                                    pool_connections=self.pool_connections,
+                                    pool_maxsize=self.pool_maxsize, pool_block=self.pool_block)
+        session.mount('http://', http_adapter)
+        session.mount('https://', https_adapter)
+
+        return session
+
+    def _new_retry(self):
+        """
+        Create the requests retry policy
+
+        The last response is returned rather than raising an error when the retries of a retry
+        status are exhausted, so that it is decoded as the other error responses.
+
+        :return: BackendRetry
+        """
+        return BackendRetry(total=self.retries, connect=self.retries, read=self.retries,
+                            backoff_factor=self.retry_backoff, jitter=self.retry_jitter,
+                            status_forcelist=self.retry_statuses, method_whitelist=RETRY_METHODS,
+                            raise_on_status=False)
+
+    def _get_session(self):
+        """
+        Get the HTTP session of the current worker or the main session
+
+        :return: requests.Session
+        """
+        return getattr(self._local, 'session', None) or self.session
+
+    def _init_worker(self):
+        """
+        Thread pool worker initializer: create a dedicated HTTP session for the worker
+
+        :return: None
+        """
+        session = self._new_session()
+        session.auth = self.session.auth
+        self._local.session = session
+        with self._pool_lock:
+            self._pool_sessions.append(session)
+
+    def _init_process(self):
+        """
+        Forked process initializer: create a dedicated HTTP session for the process
+
+        The locks may have been held by other threads of the parent process when it forked, and
+        they would never be released in the child process: the child process gets new locks.
+
+        :return: None
+        """
+        self._pool_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        for shared in [self.metrics, self.breaker, self._cache, self._etags]:
+            if shared is not None:
+                shared.reset_lock()
+        self._pool_sessions = []
+        self._init_worker()
+
+    def _release_worker(self):
+        """
+        Close the dedicated HTTP session of the current worker thread
+
+        :return: None
+        """
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            return
+        self._local.session = None
+        with self._pool_lock:
+            if session in self._pool_sessions:
+                self._pool_sessions.remove(session)
+        self._close_session(session)
+
+    @staticmethod
+    def _count_connections(session):
+        """
+        Count the connections opened and the requests sent by an HTTP session
+
+        :param session: HTTP session
+        :type session: requests.Session
+        :return: (connections, requests)
+        :rtype: tuple
+        """
+        connections = requests_count = 0
+        for adapter in session.adapters.values():
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    connections += pool.num_connections
+                    requests_count += pool.num_requests
+        return connections, requests_count
+
+    def _close_session(self, session):
+        """
+        Close an HTTP session and keep its connections statistics
+
+        :param session: HTTP session
+        :type session: requests.Session
+        :return: None
+        """
+        connections, requests_count = self._count_connections(session)
+        with self._stats_lock:
+            self._connections[0] += connections
+            self._connections[1] += requests_count
+        session.close()
+
+    def _get_connection_stats(self):
+        """
+        Get the HTTP connections statistics of the client sessions::
+
+            {'connections': 8, 'requests': 1200, 'reuse_rate': 0.993}
+
+        connections is the number of opened connections and requests the number of HTTP
+        requests sent (including the retries). The reuse rate is the part of the requests sent
+        on an already opened connection.
+
+        :return: connections statistics
+        :rtype: dict
+        """
+        with self._pool_lock:
+            sessions = [self.session] + self._pool_sessions
+        with self._stats_lock:
+            connections, requests_count = self._connections
+        for session in sessions:
+            counts = self._count_connections(session)
+            connections += counts[0]
+            requests_count += counts[1]
+
+        reuse_rate = None
+        if requests_count:
+            reuse_rate = 1 - float(connections) / requests_count
+        return {'connections': connections, 'requests': requests_count,
+                'reuse_rate': reuse_rate}
+
+    def _get_pool(self, processes=None):
+        """
+        Get the thread pool used to run requests in parallel. The pool is created when
+        it is first used and it is closed on logout.
+
+        :param processes: number of threads of the pool, default is the client processes number
+        :type processes: int
+        :return: multiprocessing.pool.ThreadPool
+        """
+        processes = processes or self.processes
+        with self._pool_lock:
+            if processes not in self._pools:
+                self._pools[processes] = ThreadPool(processes=processes,
+                                                    initializer=self._init_worker)
+            return self._pools[processes]
+
+    def close_pool(self):
+        """
+        Close the thread pools and the HTTP sessions of their workers
+
+        :return: None
+        """
+        # The workers initializer takes the lock, do not hold it while joining the workers
+        with self._pool_lock:
+            pools = list(self._pools.values())
+            self._pools = {}
+        for pool in pools:
+            pool.close()
+            pool.join()
+        with self._pool_lock:
+            sessions = self._pool_sessions
+            self._pool_sessions = []
+        for session in sessions:
+            self._close_session(session)
+
+    def _pool_map(self, func, iterable, concurrency=None):
+        """
+        Apply a function to each element, in parallel on a thread pool if concurrency is
+        greater than 1
+
+        Each pool thread uses its own HTTP session.
+
+        :param func: function to apply
+        :type func: function
+        :param iterable: elements
+        :type iterable: list
+        :param concurrency: number of parallel calls, default is the client processes number
+        :type concurrency: int
+        :return: list of the function results, in the elements order
+        :rtype: list
+        """
+        iterable = list(iterable)
+        concurrency = concurrency or self.processes
+        if concurrency <= 1 or len(iterable) <= 1:
+            return [func(element) for element in iterable]
+        return self._get_pool(concurrency).map(func, iterable)
 
     def get_url(self, endpoint):
         """
@@ -154,8 +991,9 @@ class Backend(object):  # pylint: disable=useless-object-inheritance
         """
         return urljoin(self.url_endpoint_root, endpoint)
 
-    def get_response(self, method, endpoint, headers=None, json=None, params=None, data=None):
-        # pylint: disable=too-many-arguments
+    def get_response(self, method, endpoint, headers=None, json=None, params=None, data=None,
+                     timeout=None, stream=False):
+        # pylint: disable=too-many-arguments,too-many-locals
         """
         Returns the response from the requested endpoint with the requested method
         :param method: str. one of the methods accepted by Requests ('POST', 'GET', ...)
@@ -166,6 +1004,11 @@ class Backend(object):  # pylint: disable=useless-object-inheritance
         of the :class:`Request`.
         :param json: (optional) json to send in the body of the :class:`Request`.
         :param headers: (optional) Dictionary of HTTP Headers to send with the :class:`Request`.
+        :param timeout: (optional) seconds, or (connect, read) tuple, to wait for the backend,
+        default is the client timeout
+        :param stream: (optional) True to not read the response content. The response content is
+        not counted in the compression statistics and the after_response hooks are not called,
+        see `_count_stream`
         :return: Requests.response
         """
         logger.debug("Parameters for get_response:")
@@ -178,28 +1021,190 @@ class Backend(object):  # pylint: disable=useless-object-inheritance
 
         url = self.get_url(endpoint)
 
+        if json is not None:
+            # Encode the body with our codec rather than letting Requests encode it
+            data = self.codec.dumps(json)
+            headers = dict(headers or {})
+            headers['Content-Type'] = 'application/json'
+            if self.compress_threshold and len(data) >= self.compress_threshold:
+                size = len(data)
+                data = self._compress(data)
+                headers['Content-Encoding'] = 'gzip'
+                self._count_compression('requests', size, len(data))
+
+        sent = len(data) if isinstance(data, bytes) else 0
+        self._call_hooks('before_request', method, endpoint, sent)
+        start = time.time()
+
+        if self.breaker is not None and not self.breaker.allow():
+            exp = BackendException(BACKEND_UNAVAILABLE,
+                                   "Backend unavailable, next try in less than %ss"
+                                   % self.breaker.cooldown)
+            self._call_hooks('on_error', method, endpoint, sent, exp, time.time() - start)
+            raise exp
+
         # First stage. Errors are connection errors (timeout, no session, ...)
+        # Any exception is a failure for the circuit breaker, else a probe would never end
+        failed = True
         try:
-            response = self.session.request(method=method, url=url, headers=headers, json=json,
-                                            params=params, data=data, proxies=self.proxies,
-                                            timeout=self.timeout)
+            response = self._get_session().request(method=method, url=url, headers=headers,
+                                                   params=params, data=data,
+                                                   proxies=self.proxies,
+                                                   timeout=timeout or self.timeout, stream=stream)
             logger.debug("response headers: %s", response.headers)
-            logger.debug("response content: %s", response.content)
+            if not stream:
+                logger.debug("response content: %s", response.content)
+                if hasattr(response.raw, 'tell'):
+                    # Bytes read from the connection, before decompression
+                    self._count_compression('responses', len(response.content),
+                                            response.raw.tell())
+            failed = response.status_code >= 500
         except RequestException as e:
             response = {"_status": "ERR",
                         "_error": {"message": e, "code": BACKEND_ERROR},
                         "_issues": {"message": e, "code": BACKEND_ERROR}}
-            raise BackendException(code=BACKEND_ERROR,
+            exp = BackendException(code=BACKEND_ERROR,
                                    message=e,
                                    response=response)
+            self._call_hooks('on_error', method, endpoint, sent, exp, time.time() - start)
+            raise exp
         else:
+            if not stream:
+                self._call_hooks('after_response', method, endpoint, sent, response,
+                                 time.time() - start)
             return response
+        finally:
+            if self.breaker is not None:
+                if failed:
+                    self.breaker.failure()
+                elif not stream or response.status_code != 200:
+                    # The streamed items record their result once read (see ItemsStream)
+                    self.breaker.success()
+
+    def _count_stream(self, endpoint, response, size, elapsed):
+        """
+        Count a streamed GET response once its content is read: compression statistics and
+        after_response hooks
+
+        :param endpoint: requested endpoint
+        :type endpoint: str
+        :param response: streamed response
+        :type response: requests.Response
+        :param size: decompressed content size, in bytes
+        :type size: int
+        :param elapsed: time spent for the request and reading the response, in seconds
+        :type elapsed: float
+        :return: None
+        """
+        if hasattr(response.raw, 'tell'):
+            self._count_compression('responses', size, response.raw.tell())
+        self._call_hooks('after_response', 'GET', endpoint, 0, response, elapsed)
+
+    def _call_hooks(self, name, *args):
+        """
+        Call a hook of all the registered requests hooks
+
+        A failing hook is logged and it does not prevent the request.
+
+        :param name: hook name (before_request, after_response or on_error)
+        :type name: str
+        :return: None
+        """
+        for hook in self.hooks:
+            try:
+                getattr(hook, name)(*args)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("%s hook failed", name)
+
+    def stats(self):
+        """
+        Get a snapshot of the client statistics::
+
+            {
+                'requests': {'host': {'GET': {'count': 12, ...}}, ...},
+                'compression': {'requests': {...}, 'responses': {...}},
+                'connections': {'connections': 8, 'requests': 1200, 'reuse_rate': 0.993}
+            }
+
+        requests are the metrics of the requests per resource and method (see
+        `MetricsCollector.snapshot`), empty if the metrics collector is disabled. compression
+        are the sizes and ratios of the compressed requests and responses (see
+        `_get_compression_stats`) and connections is the HTTP connections reuse (see
+        `_get_connection_stats`).
+
+        :return: client statistics
+        :rtype: dict
+        """
+        return {
+            'requests': self.metrics.snapshot() if self.metrics is not None else {},
+            'compression': self._get_compression_stats(),
+            'connections': self._get_connection_stats()
+        }
 
     @staticmethod
-    def decode(response):
+    def _compress(data):
+        """
+        Compress data with gzip
+
+        :param data: data to compress
+        :type data: bytes
+        :return: gzip compressed data
+        :rtype: bytes
+        """
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+
+    def _count_compression(self, kind, size, wire_size):
+        """
+        Count a compressed (or not) request or response body
+
+        :param kind: 'requests' or 'responses'
+        :type kind: str
+        :param size: body size
+        :type size: int
+        :param wire_size: transferred size
+        :type wire_size: int
+        :return: None
+        """
+        with self._stats_lock:
+            counters = self._compression[kind]
+            counters[0] += 1
+            counters[1] += size
+            counters[2] += wire_size
+        if wire_size and wire_size != size:
+            logger.debug("%s compression: %d -> %d bytes, ratio %.1f",
+                         kind, size, wire_size, float(size) / wire_size)
+
+    def _get_compression_stats(self):
+        """
+        Get the compression statistics of the requests body and of the responses::
+
+            {
+                'requests': {'count': 12, 'bytes': 1200000, 'wire_bytes': 150000,
+                             'ratio': 8.0},
+                'responses': {...}
+            }
+
+        The requests are only the compressed ones whereas the responses are all the responses.
+        bytes is the uncompressed size and wire_bytes the transferred size.
+
+        :return: compression statistics
+        :rtype: dict
+        """
+        stats = {}
+        with self._stats_lock:
+            for kind, (count, size, wire_size) in self._compression.items():
+                stats[kind] = {'count': count, 'bytes': size, 'wire_bytes': wire_size,
+                               'ratio': float(size) / wire_size if wire_size else None}
+        return stats
+
+    @staticmethod
+    def decode(response, codec=None, interner=None):
         """
         Decodes and returns the response as JSON (dict) or raise BackendException
         :param response: requests.response object
+        :param codec: JSON codec used to decode the response, else Requests decodes it
+        :param interner: Interner used by the codec to intern the decoded strings
         :return: dict
         """
 
@@ -211,7 +1216,10 @@ class Backend(object):  # pylint: disable=useless-object-inheritance
                                    message=e,
                                    response=response)
         else:
-            resp_json = response.json()
+            if codec is None:
+                resp_json = response.json()
+            else:
+                resp_json = codec.loads(response.content, interner=interner)
             # Catch errors not sent in a HTTP error
             error = resp_json.get('_error', None)
             if error:
@@ -232,11 +1240,21 @@ class Backend(object):  # pylint: disable=useless-object-inheritance
             self.session.auth = auth
             logger.debug("Using session token: %s", token)
         else:
+            auth = None
             self._token = None
             self.authenticated = False
             self.session.auth = None
             logger.debug("Session token/auth reinitialised")
 
+        with self._pool_lock:
+            for session in self._pool_sessions:
+                session.auth = auth
+
+        # The cached responses were got with the previous credentials
+        self._invalidate_cache()
+        if self._etags is not None:
+            self._etags.invalidate()
+
     def get_token(self):
         """Get the stored backend token"""
         return self._token
@@ -294,7 +1312,7 @@ class Backend(object):  # pylint: disable=useless-object-inheritance
             self.set_token(token=None)
             return False
 
-        resp = self.decode(response=response)
+        resp = self.decode(response, self.codec, self._get_interner())
 
         if 'token' in resp:
             self.set_token(token=resp['token'])
@@ -327,7 +1345,8 @@ class Backend(object):  # pylint: disable=useless-object-inheritance
 
         _ = self.get_response(method='POST', endpoint=endpoint)
 
-        self.session.close()
+        self.close_pool()
+        self._close_session(self.session)
         self.set_token(token=None)
 
         return True
@@ -363,12 +1382,80 @@ class Backend(object):  # pylint: disable=useless-object-inheritance
 
         return {}  # pragma: no cover - should never occur!
 
-    def get(self, endpoint, params=None):
+    @staticmethod
+    def _get_cache_key(endpoint, params):
+        """
+        Get a key identifying a request for an endpoint with some parameters
+
+        The parameters order does not matter and dictionaries or lists values are considered
+        with their JSON encoding.
+
+        :param endpoint: endpoint (API URL) relative from root endpoint
+        :type endpoint: str
+        :param params: parameters for the backend API
+        :type params: dict
+        :return: hashable key
+        :rtype: tuple
+        """
+        normalized = []
+        for key, value in sorted((params or {}).items()):
+            if isinstance(value, (dict, list)):
+                value = stdjson.dumps(value, sort_keys=True)
+            normalized.append((key, value))
+        return endpoint, tuple(normalized)
+
+    def _invalidate_cache(self, endpoint=None):
+        """
+        Drop the cached responses of the resource of an endpoint, or all the cached responses
+
+        :param endpoint: endpoint (API URL) relative from root endpoint (eg. host/id)
+        :type endpoint: str
+        :return: None
+        """
+        if self._cache is not None:
+            self._cache.invalidate(endpoint.split('/')[0] if endpoint else None)
+
+    @staticmethod
+    def _set_projection(params, fields):
+        """
+        Get the request parameters with a projection on the provided fields
+
+        The backend always returns the _id, _etag, _created and _updated fields.
+
+        :param params: parameters for the backend API
+        :type params: dict
+        :param fields: list of the fields to get, None to get all the fields
+        :type fields: list
+        :return: a copy of the parameters including the projection
+        :rtype: dict
+        """
+        params = dict(params or {})
+        if fields:
+            params['projection'] = stdjson.dumps(dict((field, 1) for field in fields))
+        return params
+
+    def _get_interner(self):
+        """
+        Get a new interner for the items decoded by a call
+
+        :return: interner, None if the client does not share the keys and values
+        :rtype: Interner
+        """
+        return Interner(self.intern_fields) if self.intern else None
+
+    def get(self, endpoint, params=None, fields=None, cache=True, timeout=None):
+        # pylint: disable=too-many-arguments
         """
         Get items or item in alignak backend
 
         If an error occurs, a BackendException is raised.
 
+        If fields is provided, only those fields are requested to the backend (projection).
+
+        If the client has a responses cache (see `cache_size`), a response still in the cache is
+        returned without requesting the backend, unless cache is False. Each call returns a new
+        dictionary, so the caller may modify it.
+
         This method builds a response as a dictionary that always contains: _items and _status::
 
             {
@@ -382,26 +1469,130 @@ class Backend(object):  # pylint: disable=useless-object-inheritance
         :type endpoint: str
         :param params: parameters for the backend API
         :type params: dict
+        :param fields: list of the fields to get
+        :type fields: list
+        :param cache: False to ignore the responses cache
+        :type cache: bool
+        :param timeout: seconds, or (connect, read) tuple, to wait for the backend, default is
+        the client timeout
+        :type timeout: float or tuple
         :return: dictionary as specified upper
         :rtype: dict
         """
-        response = self.get_response(method='GET', endpoint=endpoint, params=params)
+        if fields:
+            params = self._set_projection(params, fields)
+        return self._get(endpoint, params, cache, timeout, self._get_interner())
 
-        resp = self.decode(response=response)
+    def _get(self, endpoint, params=None, cache=True, timeout=None, interner=None):
+        # pylint: disable=too-many-arguments
+        """
+        Get items or item in alignak backend, see `get`
+
+        :param endpoint: endpoint (API URL) relative from root endpoint
+        :type endpoint: str
+        :param params: parameters for the backend API
+        :type params: dict
+        :param cache: False to ignore the responses cache
+        :type cache: bool
+        :param timeout: seconds, or (connect, read) tuple, to wait for the backend, default is
+        the client timeout
+        :type timeout: float or tuple
+        :param interner: interner of the items keys and values
+        :type interner: Interner
+        :return: backend response
+        :rtype: dict
+        """
+        key = None
+        if self._etags is not None or self._cache is not None:
+            key = self._get_cache_key(endpoint, params)
+        use_cache = cache and self._cache is not None
+
+        content = self._cache.get(key) if use_cache else None
+        if content is not None:
+            logger.debug("cached: %s", endpoint)
+            resp = self.codec.loads(content, interner=interner)
+        else:
+            headers = None
+            cached = None
+            if self._etags is not None:
+                cached = self._etags.get(key)
+                if cached:
+                    headers = {'If-None-Match': cached[0]}
+
+            response = self.get_response(method='GET', endpoint=endpoint, params=params,
+                                         headers=headers, timeout=timeout)
+
+            if cached and response.status_code == 304:
+                logger.debug("not modified: %s", endpoint)
+                content = cached[1]
+                resp = self.codec.loads(content, interner=interner)
+            else:
+                resp = self.decode(response, self.codec, interner)
+                content = response.content
+                if self._etags is not None:
+                    etag = response.headers.get('ETag') or resp.get('_etag')
+                    if etag:
+                        self._etags.set(key, (etag, content))
+                    else:
+                        self._etags.discard(key)
+            if use_cache:
+                self._cache.set(key, content)
         if '_status' not in resp:  # pragma: no cover - need specific backend tests
             resp['_status'] = 'OK'  # TODO: Sure??
 
+        if params and 'max_results' in params and '_meta' in resp:
+            # The backend reduces the requested page size to its own limit
+            max_results = int(resp['_meta']['max_results'])
+            if max_results < int(params['max_results']):
+                self._page_sizes[endpoint.split('/')[0]] = max_results
+
         return resp
 
-    def get_all(self, endpoint, params=None):
-        # pylint: disable=too-many-locals
+    def _get_page_size(self, endpoint):
+        """
+        Get the page size to request for an endpoint when getting all its items
+
+        This is the backend pagination limit discovered for this endpoint if it is smaller than
+        the configured page size, else the configured page size, else
+        BACKEND_PAGINATION_PROBE to discover the backend limit.
+
+        :param endpoint: endpoint (API URL) relative from root endpoint
+        :type endpoint: str
+        :return: page size
+        :rtype: int
+        """
+        page_size = self.page_size or BACKEND_PAGINATION_PROBE
+        limit = self._page_sizes.get(endpoint.split('/')[0])
+        if limit and limit < page_size:
+            return limit
+        return page_size
+
+    def get_all(self, endpoint, params=None, pagination=None, fields=None, deadline=None,
+                compact=False, join=None):
+        # pylint: disable=too-many-locals,too-many-arguments
         """
         Get all items in the specified endpoint of alignak backend
 
         If an error occurs, a BackendException is raised.
 
-        If the max_results parameter is not specified in parameters, it is set to
-        BACKEND_PAGINATION_LIMIT (backend maximum value) to limit requests number.
+        If fields is provided, only those fields are requested to the backend (projection).
+
+        The pagination parameter overrides the client pagination strategy for this call.
+
+        If deadline is provided, all the pages must be got within deadline seconds. Each page
+        request waits at most until the deadline; once it is passed, the remaining pages are not
+        requested and a BackendException is raised with code BACKEND_TIMEOUT.
+
+        If compact is True, the _items of the response is a `CompactItems` store rather than a
+        list of dictionaries. The items are dictionary-like records, several times smaller in
+        memory, for the large results.
+
+        If join is provided, the links of the items are replaced with the linked documents as
+        the backend does with an `embedded` parameter, but each linked document is only got once
+        (see `_join_items`). The join fields must be included in the fields, if any.
+
+        If the max_results parameter is not specified in parameters, it is set to the
+        endpoint page size (see `_get_page_size`) to limit requests number.
 
         This method builds a response that always contains: _items and _status::
 
@@ -416,67 +1607,714 @@ class Backend(object):  # pylint: disable=useless-object-inheritance
         :type endpoint: str
         :param params: list of parameters for the backend API
         :type params: dict
+        :param pagination: PAGINATION_PAGE or PAGINATION_KEYSET (default is the client one)
+        :type pagination: str
+        :param fields: list of the fields to get
+        :type fields: list
+        :param deadline: maximum time to get all the items, in seconds
+        :type deadline: float
+        :param compact: True to get the items in a compact store
+        :type compact: bool
+        :param join: resource of the linked documents, per link field
+        :type join: dict
         :return: dict of properties
         :rtype: dict
         """
+        pagination = pagination or self.pagination
+        expiry = time.time() + deadline if deadline is not None else None
+        if fields:
+            params = self._set_projection(params, fields)
+
         # Set max results at maximum value supported by the backend to limit requests number
         if not params:
-            params = {'max_results': BACKEND_PAGINATION_LIMIT}
+            params = {'max_results': self._get_page_size(endpoint)}
         elif params and 'max_results' not in params:
-            params['max_results'] = BACKEND_PAGINATION_LIMIT
+            params['max_results'] = self._get_page_size(endpoint)
 
         # Get first page
-        last_page = False
-        items = []
+        items = CompactItems() if compact else []
         if self.processes == 1:
-            while not last_page:
-                # Get elements ...
-                resp = self.get(endpoint=endpoint, params=params)
-                # Response contains:
-                # _items:
-                # ...
-                # _links:
-                #  self, parent, prev, last, next
-                # _meta:
-                # - max_results, total, page
-
-                if 'next' in resp['_links']:
-                    # Go to next page ...
-                    params['page'] = int(resp['_meta']['page']) + 1
-                    params['max_results'] = int(resp['_meta']['max_results'])
-                else:
-                    last_page = True
-                items.extend(resp['_items'])
+            items.extend(self.iter_all(endpoint, params=params, pagination=pagination,
+                                       deadline=deadline))
+        elif self.executor == EXECUTOR_THREAD:
+            items = self._get_all_threads(endpoint, params, pagination, expiry)
         else:
-            def get_pages(endpoint, params, pages, out_q):
-                """
-                Function to get pages loaded by multiprocesses
-
-                :param endpoint: endpoint to get data
-                :type endpoint: string
-                :param params: parameters for get request
-                :type params: dict
-                :param pages: range of pages to get
-                :type pages: list
-                :param out_q: Queue object
-                :type out_q: multiprocessing.Queue
-                :return: None
-                """
-                multi_items = []
-                for page in pages:
-                    params['page'] = page
-                    resp = self.get(endpoint, params)
-                    multi_items.extend(resp['_items'])
-                out_q.put(multi_items)
+            items = self._get_all_processes(endpoint, params, pagination, expiry)
+        if join:
+            self._join_items(items, join,
+                             deadline=expiry - time.time() if expiry is not None else None)
+        if compact and self.processes != 1:
+            items = CompactItems(items)
+
+        return {
+            '_items': items,
+            '_status': 'OK'
+        }
+
+    def iter_all(self, endpoint, params=None, pages=False, prefetch=0, pagination=None,
+                 fields=None, deadline=None, stream=False):
+        # pylint: disable=too-many-arguments
+        """
+        Iterate over all the items in the specified endpoint of alignak backend
+
+        This method gets the endpoint pages one after the other, as `get_all` does, but it
+        yields the items (or the pages items lists if `pages` is True) as soon as each page is
+        decoded. Only the current page is kept in memory, whatever the number of items.
+
+        If prefetch is set, a background thread reads ahead up to `prefetch` pages while the
+        caller processes the current one, so that the requests latency overlaps with the items
+        processing. The memory is then bounded by `prefetch` + 2 pages.
+
+        If deadline is provided, all the pages must be got within deadline seconds from the
+        iter_all call, else a BackendException is raised with code BACKEND_TIMEOUT. The time
+        spent by the caller to process the items counts.
+
+        If stream is True, the items are decoded one by one while each page is read (see
+        `_get_stream`), so that a whole page is never decoded in memory. The pages items lists
+        are then items iterators and prefetch is ignored. The items of a page that are not
+        iterated are read, and dropped, before getting the next page. This requires the ijson
+        library.
+
+        If an error occurs, a BackendException is raised.
+
+        If the max_results parameter is not specified in parameters, it is set to the
+        endpoint page size (see `_get_page_size`) to limit requests number.
+
+        :param endpoint: endpoint (API URL) relative from root endpoint
+        :type endpoint: str
+        :param params: list of parameters for the backend API
+        :type params: dict
+        :param pages: True to yield the items list of each page rather than each item
+        :type pages: bool
+        :param prefetch: number of pages to read ahead (0 to disable)
+        :type prefetch: int
+        :param pagination: PAGINATION_PAGE or PAGINATION_KEYSET (default is the client one)
+        :type pagination: str
+        :param fields: list of the fields to get (projection)
+        :type fields: list
+        :param deadline: maximum time to get all the pages, in seconds
+        :type deadline: float
+        :param stream: True to decode the items while the pages are read
+        :type stream: bool
+        :return: generator of items (or of items lists)
+        """
+        expiry = time.time() + deadline if deadline is not None else None
+        params = self._set_projection(params, fields)
+        if 'max_results' not in params:
+            params['max_results'] = self._get_page_size(endpoint)
+
+        # The shared keys and values are dropped with the generator
+        interner = self._get_interner()
+        if (pagination or self.pagination) == PAGINATION_KEYSET:
+            responses = self._iter_keyset_pages(endpoint, params, expiry=expiry, stream=stream,
+                                                interner=interner)
+        else:
+            responses = self._iter_pages(endpoint, params, expiry, stream, interner)
+
+        if prefetch and not stream:
+            responses = self._prefetch_pages(endpoint, responses, prefetch)
+
+        if pages:
+            return (resp['_items'] for resp in responses)
+        return (item for resp in responses for item in resp['_items'])
+
+    def _join_items(self, items, join, documents=None, deadline=None):
+        """
+        Replace the links of the items with the linked documents
+
+        This is a client-side alternative to the backend `embedded` parameter, which makes the
+        backend resolve the links of each item and send the same linked documents again for
+        each item. Here, the linked documents are searched by _id, BACKEND_BULK_SIZE _id per
+        request (in parallel if the client has more than one process), each linked document is
+        only got once and all the items linked to a document share the same dictionary.
+
+        join maps the link fields to the resource of the linked documents, eg.
+        {'check_period': 'timeperiod', 'check_command': 'command', '_realm': 'realm'}. A link
+        is an _id or a list of _id. The links to a document that does not exist are unchanged.
+
+        The documents got are added to documents, to join other items later without getting
+        the same documents again.
+
+        If an error occurs, a BackendException is raised.
+
+        :param items: items, updated in place
+        :type items: list
+        :param join: resource of the linked documents, per link field
+        :type join: dict
+        :param documents: linked documents already got, per resource and _id
+        :type documents: dict
+        :param deadline: maximum time to get the linked documents, in seconds
+        :type deadline: float
+        :return: the linked documents, per resource and _id
+        :rtype: dict
+        """
+        expiry = time.time() + deadline if deadline is not None else None
+        if documents is None:
+            documents = {}
+        for resource in join.values():
+            documents.setdefault(resource, {})
+
+        missing = self._get_missing_links(items, join, documents)
+        self._get_linked_documents(missing, documents, expiry)
+
+        for item in items:
+            for field, resource in join.items():
+                value = item.get(field)
+                if not value:
+                    continue
+                known = documents[resource]
+                if isinstance(value, list):
+                    item[field] = [known.get(link, link) if isinstance(link, (str, type(u'')))
+                                   else link for link in value]
+                elif isinstance(value, (str, type(u''))):
+                    item[field] = known.get(value, value)
+
+        return documents
+
+    @staticmethod
+    def _get_missing_links(items, join, documents):
+        """
+        Get the _id of the linked documents that are not already got
+
+        :param items: items linking the documents
+        :type items: list
+        :param join: resource of the linked documents, per link field
+        :type join: dict
+        :param documents: linked documents already got, per resource and _id
+        :type documents: dict
+        :return: _id of the linked documents to get, per resource
+        :rtype: dict
+        """
+        missing = {}
+        for item in items:
+            for field, resource in join.items():
+                value = item.get(field)
+                # A link is an _id or a list of _id
+                for link in value if isinstance(value, list) else [value]:
+                    if isinstance(link, (str, type(u''))) and link not in documents[resource]:
+                        missing.setdefault(resource, set()).add(link)
+        return missing
+
+    def _get_linked_documents(self, missing, documents, expiry=None):
+        """
+        Get the linked documents by chunks of BACKEND_BULK_SIZE _id, with the client pool
+
+        :param missing: _id of the linked documents to get, per resource
+        :type missing: dict
+        :param documents: linked documents, per resource and _id, updated with the documents got
+        :type documents: dict
+        :param expiry: time when all the documents must be got
+        :type expiry: float
+        :return: None
+        """
+        chunks = []
+        for resource, links in missing.items():
+            links = sorted(links)
+            chunks.extend((resource, links[index:index + BACKEND_BULK_SIZE])
+                          for index in range(0, len(links), BACKEND_BULK_SIZE))
+
+        def get_chunk(chunk):
+            """Get the linked documents of a chunk of _id"""
+            resource, links = chunk
+            params = {'where': stdjson.dumps({'_id': {'$in': links}})}
+            remaining = expiry - time.time() if expiry is not None else None
+            return resource, list(self.iter_all(resource, params=params, deadline=remaining))
+
+        for resource, linked in self._pool_map(get_chunk, chunks):
+            for document in linked:
+                # The embedded documents do not have links
+                document.pop('_links', None)
+                documents[resource][document['_id']] = document
+
+    def _get_stream(self, endpoint, params=None, timeout=None, interner=None):
+        """
+        Get items in alignak backend, decoded while the response is read
+
+        The _items of the returned dictionary is an `ItemsStream` that yields the items one by
+        one, so that the response content, its decoded text and all its items are not in memory
+        at the same time. The other fields of the response (_links, _meta) are set in the
+        dictionary once the items are read.
+
+        The responses cache and the conditional requests are not used. This requires the
+        ijson library.
+
+        :param endpoint: endpoint (API URL) relative from root endpoint
+        :type endpoint: str
+        :param params: parameters for the backend API
+        :type params: dict
+        :param timeout: seconds, or (connect, read) tuple, to wait for the backend, default is
+        the client timeout
+        :type timeout: float or tuple
+        :param interner: interner of the items keys and values
+        :type interner: Interner
+        :return: dictionary with an _items stream
+        :rtype: dict
+        """
+        if ijson is None:
+            raise BackendException(BACKEND_ERROR, "Streaming requires the ijson library")
+
+        response = self.get_response(method='GET', endpoint=endpoint, params=params,
+                                     timeout=timeout, stream=True)
+        if response.status_code != 200:
+            # Count and raise the error
+            self._count_stream(endpoint, response, len(response.content),
+                               response.elapsed.total_seconds())
+            self.decode(response, self.codec, interner)
+
+        resp = {'_status': 'OK'}
+        resp['_items'] = ItemsStream(self, endpoint, response, resp,
+                                     expiry=getattr(BackendRetry.deadline, 'expiry', None),
+                                     interner=interner)
+        return resp
+
+    def _get_page(self, endpoint, params, expiry=None, stream=False, interner=None):
+        """
+        Get a page of an endpoint, before the expiry time of the operation if any
+
+        The request timeout is reduced to the time left before the expiry and the request is not
+        retried after the expiry (see `BackendRetry`). A BackendException with code
+        BACKEND_TIMEOUT is raised if the expiry time is passed.
+
+        :param endpoint: endpoint to get data
+        :type endpoint: string
+        :param params: parameters for get request
+        :type params: dict
+        :param expiry: time (as returned by time.time) when the operation must be finished
+        :type expiry: float
+        :param stream: True to get the page items as a stream (see `_get_stream`)
+        :type stream: bool
+        :param interner: interner of the items keys and values
+        :type interner: Interner
+        :return: the backend response
+        :rtype: dict
+        """
+        if expiry is None:
+            if stream:
+                return self._get_stream(endpoint, params, interner=interner)
+            return self._get(endpoint, params, cache=False, interner=interner)
+
+        remaining = expiry - time.time()
+        if remaining <= 0:
+            raise BackendException(BACKEND_TIMEOUT, "Deadline exceeded getting %s" % endpoint)
+        timeout = remaining
+        if isinstance(self.timeout, tuple):
+            timeout = tuple(remaining if value is None else min(value, remaining)
+                            for value in self.timeout)
+        elif self.timeout is not None:
+            timeout = min(self.timeout, remaining)
+
+        BackendRetry.deadline.expiry = expiry
+        try:
+            if stream:
+                return self._get_stream(endpoint, params, timeout=timeout, interner=interner)
+            return self._get(endpoint, params, cache=False, timeout=timeout, interner=interner)
+        except BackendException as exp:
+            if exp.code == BACKEND_ERROR and time.time() >= expiry:
+                raise BackendException(BACKEND_TIMEOUT, "Deadline exceeded getting %s" % endpoint)
+            raise
+        finally:
+            BackendRetry.deadline.expiry = None
+
+    def _iter_pages(self, endpoint, params, expiry=None, stream=False, interner=None):
+        """
+        Get the endpoint pages one after the other
+
+        The next page is requested once the caller got the previous one. If stream is True, the
+        items of the previous page that the caller did not read are read first.
+
+        :param endpoint: endpoint to get data
+        :type endpoint: string
+        :param params: parameters for get request, updated with the next page number
+        :type params: dict
+        :param expiry: time when all the pages must be got (see `_get_page`)
+        :type expiry: float
+        :param stream: True to get the pages items as streams (see `_get_stream`)
+        :type stream: bool
+        :param interner: interner of the items keys and values
+        :type interner: Interner
+        :return: generator of the backend responses
+        """
+        last_page = False
+        while not last_page:
+            # Get elements ...
+            resp = self._get_page(endpoint, params, expiry, stream, interner)
+            # Response contains:
+            # _items:
+            # ...
+            # _links:
+            #  self, parent, prev, last, next
+            # _meta:
+            # - max_results, total, page
+            yield resp
+            if stream:
+                # The links of a streamed page are known once all its items are read
+                resp['_items'].drain()
+
+            if 'next' in resp['_links']:
+                # Go to next page ...
+                params['page'] = int(resp['_meta']['page']) + 1
+                params['max_results'] = int(resp['_meta']['max_results'])
+            else:
+                last_page = True
+
+    @staticmethod
+    def _get_where(params):
+        """
+        Get the where filter of the request parameters as a dictionary
+
+        :param params: parameters for get request
+        :type params: dict
+        :return: where filter
+        :rtype: dict
+        """
+        where = params.get('where') or {}
+        if not isinstance(where, dict):
+            where = stdjson.loads(where)
+        return where
+
+    def _iter_keyset_pages(self, endpoint, params, lower=None, upper=None, expiry=None,
+                           stream=False, interner=None):
+        """
+        Get the endpoint pages one after the other with a keyset pagination
+
+        The items are sorted by _id and each page is filtered on the items which _id is greater
+        than the last _id of the previous page. If lower and/or upper are provided, only the
+        items with lower <= _id < upper are got.
+
+        :param endpoint: endpoint to get data
+        :type endpoint: string
+        :param params: parameters for get request
+        :type params: dict
+        :param lower: lowest _id to get (included)
+        :type lower: str
+        :param upper: highest _id to get (excluded)
+        :type upper: str
+        :param expiry: time when all the pages must be got (see `_get_page`)
+        :type expiry: float
+        :param stream: True to get the pages items as streams (see `_get_stream`)
+        :type stream: bool
+        :param interner: interner of the items keys and values
+        :type interner: Interner
+        :return: generator of the backend responses
+        """
+        # pylint: disable=too-many-arguments,too-many-locals
+        if params.get('sort', '_id') != '_id':
+            raise BackendException(BACKEND_ERROR, "Keyset pagination requires sorting on _id")
+
+        params = dict(params, sort='_id')
+        params.pop('page', None)
+        where = self._get_where(params)
+
+        last_id = None
+        last_page = False
+        while not last_page:
+            condition = {}
+            if last_id is not None:
+                condition['$gt'] = last_id
+            elif lower is not None:
+                condition['$gte'] = lower
+            if upper is not None:
+                condition['$lt'] = upper
+
+            page_where = where
+            if condition and '_id' in where:
+                page_where = {'$and': [where, {'_id': condition}]}
+            elif condition:
+                page_where = dict(where, _id=condition)
+            params['where'] = stdjson.dumps(page_where)
+
+            resp = self._get_page(endpoint, params, expiry, stream, interner)
+            yield resp
+            if stream:
+                # The links of a streamed page are known once all its items are read
+                resp['_items'].drain()
+
+            items = resp['_items']
+            last_item = items.last if stream else (items[-1] if items else None)
+            if 'next' in resp['_links'] and last_item:
+                # Go to next page ...
+                last_id = last_item['_id']
+                params['max_results'] = int(resp['_meta']['max_results'])
+            else:
+                last_page = True
+
+    def _get_keyset_ranges(self, endpoint, params, count, expiry=None):
+        """
+        Split the _id range of the endpoint items in count ranges
+
+        The lowest and highest _id of the items are got from the backend, then the range between
+        them is split in count ranges of the same width.
+
+        :param endpoint: endpoint to get data
+        :type endpoint: string
+        :param params: parameters for get request
+        :type params: dict
+        :param count: number of ranges
+        :type count: int
+        :param expiry: time when the bounds must be got (see `_get_page`)
+        :type expiry: float
+        :return: list of (lower, upper) _id tuples, the lower is included, the upper is excluded
+        :rtype: list
+        """
+        bounds = []
+        for sort in ['_id', '-_id']:
+            bound_params = dict(params, sort=sort, max_results=1)
+            bound_params.pop('page', None)
+            bound_params.pop('projection', None)
+            resp = self._get_page(endpoint, bound_params, expiry)
+            if not resp['_items']:
+                return []
+            bounds.append(int(resp['_items'][0]['_id'], 16))
+
+        lowest, highest = bounds[0], bounds[1] + 1
+        width = max(-(-(highest - lowest) // count), 1)
+        ranges = []
+        for begin in range(lowest, highest, width):
+            end = min(begin + width, highest)
+            ranges.append(('%024x' % begin, '%024x' % end))
+        return ranges
+
+    def _prefetch_pages(self, endpoint, responses, depth):
+        """
+        Get the endpoint pages in a background thread that reads ahead up to depth pages
+
+        The pages are exchanged through a bounded queue. A raised exception is forwarded to
+        the consumer and the background thread stops if the consumer stops iterating.
+
+        :param endpoint: endpoint to get data
+        :type endpoint: string
+        :param responses: generator of the backend responses, iterated in the background
+        :type responses: generator
+        :param depth: maximum number of pages read ahead
+        :type depth: int
+        :return: generator of the backend responses
+        """
+        out_q = Queue(maxsize=depth)
+        stop = threading.Event()
+        end = object()
+
+        def put(element):
+            """Put an element in the queue unless the consumer stopped iterating"""
+            while not stop.is_set():
+                try:
+                    out_q.put(element, timeout=0.1)
+                    return True
+                except Full:
+                    continue
+            return False
+
+        def get_pages():
+            """Function to get the pages in the background thread"""
+            self._init_worker()
+            try:
+                for resp in responses:
+                    if not put(resp):
+                        return
+                put(end)
+            except Exception as exp:  # pylint: disable=broad-except
+                put(exp)
+            finally:
+                self._release_worker()
+
+        thread = threading.Thread(target=get_pages, name='prefetch-%s' % endpoint)
+        thread.daemon = True
+        thread.start()
+        try:
+            while True:
+                element = out_q.get()
+                if element is end:
+                    break
+                if isinstance(element, Exception):
+                    raise element
+                yield element
+        finally:
+            stop.set()
+            thread.join()
+
+    def _get_all_threads(self, endpoint, params, pagination, expiry=None):
+        """
+        Get all the pages of an endpoint with the thread pool
+
+        With a page pagination, the first page is requested to get the number of pages, then the
+        other pages are requested by the pool workers. With a keyset pagination, each worker
+        scans a range of _id. The items are returned in the pages order.
+
+        Once the expiry time is passed, the workers do not request their remaining pages.
 
+        :param endpoint: endpoint to get data
+        :type endpoint: string
+        :param params: parameters for get request
+        :type params: dict
+        :param pagination: PAGINATION_PAGE or PAGINATION_KEYSET
+        :type pagination: str
+        :param expiry: time when all the pages must be got (see `_get_page`)
+        :type expiry: float
+        :return: list of items
+        :rtype: list
+        """
+        # Keys and values shared by the items of this call
+        interner = self._get_interner()
+
+        def get_page(page):
+            """
+            Function to get a page in a pool worker
+
+            :param page: page number
+            :type page: int
+            :return: list of the page items
+            :rtype: list
+            """
+            page_params = dict(params, page=page, max_results=max_results)
+            return self._get_page(endpoint, page_params, expiry, interner=interner)['_items']
+
+        def get_range(bounds):
+            """
+            Function to get a range of _id in a pool worker
+
+            :param bounds: lower and upper _id
+            :type bounds: tuple
+            :return: list of the range items
+            :rtype: list
+            """
+            range_items = []
+            for resp in self._iter_keyset_pages(endpoint, params, bounds[0], bounds[1], expiry,
+                                                interner=interner):
+                range_items.extend(resp['_items'])
+            return range_items
+
+        items = []
+        if pagination == PAGINATION_KEYSET:
+            ranges = self._get_keyset_ranges(endpoint, params, self.processes, expiry)
+            for range_items in self._get_pool().map(get_range, ranges):
+                items.extend(range_items)
+            return items
+
+        # Get first page
+        resp = self._get_page(endpoint, params, expiry, interner=interner)
+        items.extend(resp['_items'])
+        if 'next' not in resp['_links']:
+            return items
+
+        max_results = int(resp['_meta']['max_results'])
+        number_pages = int(math.ceil(
+            float(resp['_meta']['total']) / float(max_results)))
+
+        for page_items in self._get_pool().map(get_page, range(2, number_pages + 1)):
+            items.extend(page_items)
+
+        return items
+
+    def _get_all_processes(self, endpoint, params, pagination, expiry=None):
+        # pylint: disable=too-many-locals
+        """
+        Get all the pages of an endpoint with forked processes
+
+        With a page pagination, the pages are shared between the processes. With a keyset
+        pagination, each process scans a range of _id.
+
+        Once the expiry time is passed, the processes still running are terminated.
+
+        :param endpoint: endpoint to get data
+        :type endpoint: string
+        :param params: parameters for get request
+        :type params: dict
+        :param pagination: PAGINATION_PAGE or PAGINATION_KEYSET
+        :type pagination: str
+        :param expiry: time when all the pages must be got (see `_get_page`)
+        :type expiry: float
+        :return: list of items
+        :rtype: list
+        """
+        # Keys and values shared by the items of this call, in each process
+        interner = self._get_interner()
+
+        def get_pages(endpoint, params, pages, out_q):
+            """
+            Function to get pages loaded by multiprocesses
+
+            :param endpoint: endpoint to get data
+            :type endpoint: string
+            :param params: parameters for get request
+            :type params: dict
+            :param pages: range of pages to get
+            :type pages: list
+            :param out_q: Queue object
+            :type out_q: multiprocessing.Queue
+            :return: None
+            """
+            # Do not share the parent process HTTP connections
+            self._init_process()
+
+            multi_items = []
+            for page in pages:
+                params['page'] = page
+                resp = self._get_page(endpoint, params, expiry, interner=interner)
+                multi_items.extend(resp['_items'])
+            out_q.put(multi_items)
+
+        def get_range(endpoint, params, bounds, out_q):
+            """
+            Function to get a range of _id loaded by multiprocesses
+
+            :param endpoint: endpoint to get data
+            :type endpoint: string
+            :param params: parameters for get request
+            :type params: dict
+            :param bounds: index of the range, lower and upper _id
+            :type bounds: tuple
+            :param out_q: Queue object
+            :type out_q: multiprocessing.Queue
+            :return: None
+            """
+            # Do not share the parent process HTTP connections
+            self._init_process()
+
+            multi_items = []
+            for resp in self._iter_keyset_pages(endpoint, params, bounds[1], bounds[2], expiry,
+                                                interner=interner):
+                multi_items.extend(resp['_items'])
+            out_q.put((bounds[0], multi_items))
+
+        def get_result():
+            """
+            Get the result of a process, terminate the processes if the expiry time is passed
+
+            :return: result put in the queue by a process
+            """
+            if expiry is None:
+                return out_q.get()
+            try:
+                return out_q.get(timeout=max(expiry - time.time(), 0))
+            except Empty:
+                for proc in procs:
+                    proc.terminate()
+                raise BackendException(BACKEND_TIMEOUT, "Deadline exceeded getting %s" % endpoint)
+
+        out_q = multiprocessing.Queue()
+        procs = []
+        if pagination == PAGINATION_KEYSET:
+            ranges = self._get_keyset_ranges(endpoint, params, self.processes, expiry)
+            for index, bounds in enumerate(ranges):
+                p = multiprocessing.Process(target=get_range,
+                                            args=(endpoint, params,
+                                                  (index, bounds[0], bounds[1]), out_q))
+                procs.append(p)
+                p.start()
+
+            # Collect the ranges results and sort them in the _id order
+            results = sorted([get_result() for _ in ranges], key=lambda result: result[0])
+            items = []
+            for _, range_items in results:
+                items.extend(range_items)
+        else:
             # Get first page
-            resp = self.get(endpoint, params)
+            items = []
+            resp = self._get_page(endpoint, params, expiry, interner=interner)
+            params['max_results'] = int(resp['_meta']['max_results'])
             number_pages = int(math.ceil(
                 float(resp['_meta']['total']) / float(resp['_meta']['max_results'])))
 
-            out_q = multiprocessing.Queue()
             chunksize = int(math.ceil(number_pages / float(self.processes)))
-            procs = []
             for i in range(self.processes):
                 begin = i * chunksize
                 end = begin + chunksize
@@ -492,19 +2330,16 @@ class Backend(object):  # pylint: disable=useless-object-inheritance
             # Collect all results into a single result dict. We know how many dicts
             # with results to expect.
             for i in range(self.processes):
-                items.extend(out_q.get())
+                items.extend(get_result())
 
-            # Wait for all worker processes to finish
-            for p in procs:
-                p.join()
+        # Wait for all worker processes to finish
+        for p in procs:
+            p.join()
 
-        return {
-            '_items': items,
-            '_status': 'OK'
-        }
+        return items
 
-    def post(self, endpoint, data, files=None, headers=None):
-        # pylint: disable=unused-argument
+    def post(self, endpoint, data, files=None, headers=None, timeout=None):
+        # pylint: disable=unused-argument,too-many-arguments
         """
         Create a new item
 
@@ -516,13 +2351,17 @@ class Backend(object):  # pylint: disable=useless-object-inheritance
         :type files: None
         :param headers: headers (example: Content-Type)
         :type headers: dict
+        :param timeout: seconds, or (connect, read) tuple, to wait for the backend, default is
+        the client timeout
+        :type timeout: float or tuple
         :return: response (creation information)
         :rtype: dict
         """
-        # We let Requests encode data to json
-        response = self.get_response(method='POST', endpoint=endpoint, json=data, headers=headers)
+        response = self.get_response(method='POST', endpoint=endpoint, json=data, headers=headers,
+                                     timeout=timeout)
+        self._invalidate_cache(endpoint)
 
-        resp = self.decode(response=response)
+        resp = self.decode(response, self.codec, self._get_interner())
 
         # TODO: Add files support (cf. Requests - post-a-multipart-encoded-file)
         # try:
@@ -547,7 +2386,113 @@ class Backend(object):  # pylint: disable=useless-object-inheritance
 
         return resp
 
-    def patch(self, endpoint, data, headers=None, inception=False):
+    def post_many(self, endpoint, items, chunk_size=BACKEND_BULK_SIZE, concurrency=None):
+        # pylint: disable=too-many-arguments
+        """
+        Create many items with list payloads
+
+        The items are sent by chunks of `chunk_size` items, one request per chunk. The chunks
+        are sent in parallel if concurrency is greater than 1.
+
+        This method does not raise a BackendException, it returns the creation result of each
+        item, in the provided items order. A result is the backend response for the item::
+
+            {u'_status': u'OK', u'_id': ..., u'_etag': ..., ...}
+
+        or an error::
+
+            {u'_status': u'ERR', u'_issues': {...}}
+            {u'_status': u'ERR', u'_error': {u'code': 1000, u'message': ...}}
+
+        The backend refuses a whole chunk if one of its items is not valid. The valid items of
+        a refused chunk are then sent again.
+
+        :param endpoint: endpoint (API URL)
+        :type endpoint: str
+        :param items: properties of the items to create
+        :type items: list
+        :param chunk_size: number of items sent with a single request
+        :type chunk_size: int
+        :param concurrency: number of parallel requests, default is the client processes number
+        :type concurrency: int
+        :return: list of the creation results
+        :rtype: list
+        """
+        items = list(items)
+        chunks = [items[index:index + chunk_size] for index in range(0, len(items), chunk_size)]
+
+        results = []
+        for chunk_results in self._pool_map(lambda chunk: self._post_chunk(endpoint, chunk),
+                                            chunks, concurrency):
+            results.extend(chunk_results)
+        return results
+
+    def _post_chunk(self, endpoint, items):
+        """
+        Create items with a list payload
+
+        :param endpoint: endpoint (API URL)
+        :type endpoint: str
+        :param items: properties of the items to create
+        :type items: list
+        :return: list of the creation results
+        :rtype: list
+        """
+        try:
+            response = self.get_response(method='POST', endpoint=endpoint, json=items)
+            self._invalidate_cache(endpoint)
+
+            if response.status_code == 422:
+                # The backend returns a single document for a single item
+                resp = self.codec.loads(response.content)
+                results = resp.get('_items', [resp])
+                if len(results) == len(items):
+                    valid = [index for index, result in enumerate(results)
+                             if result.get('_status') == 'OK']
+                    if valid and len(valid) < len(items):
+                        created = self._post_chunk(endpoint, [items[index] for index in valid])
+                        for index, result in zip(valid, created):
+                            results[index] = result
+                    return results
+
+            resp = self.decode(response, self.codec, self._get_interner())
+            return resp.get('_items', [resp])
+        except BackendException as exp:
+            return [self._get_error_result(exp) for _ in items]
+
+    @staticmethod
+    def _get_error_result(exception):
+        """
+        Get the result of a failed request for the bulk functions
+
+        When the exception message is the backend response content, the backend _error and
+        _issues are copied into the result.
+
+        :param exception: raised exception
+        :type exception: BackendException
+        :return: error result
+        :rtype: dict
+        """
+        result = {'_status': 'ERR', '_error': {'code': exception.code}}
+        message = exception.message
+        if isinstance(message, bytes):
+            message = message.decode('utf-8', 'replace')
+            try:
+                resp = stdjson.loads(message)
+            except ValueError:
+                resp = None
+            if isinstance(resp, dict) and '_error' in resp:
+                result['_error'] = resp['_error']
+                if '_issues' in resp:
+                    result['_issues'] = resp['_issues']
+                return result
+        if not isinstance(message, (str, type(u''))):
+            message = str(message)
+        result['_error']['message'] = message
+        return result
+
+    def patch(self, endpoint, data, headers=None, inception=False, timeout=None):
+        # pylint: disable=too-many-arguments
         """
         Method to update an item
 
@@ -586,30 +2531,75 @@ class Backend(object):  # pylint: disable=useless-object-inheritance
         :type headers: dict
         :param inception: if True tries to get the last _etag
         :type inception: bool
+        :param timeout: seconds, or (connect, read) tuple, to wait for the backend, default is
+        the client timeout
+        :type timeout: float or tuple
         :return: dictionary containing patch response from the backend
         :rtype: dict
         """
         if not headers:
             raise BackendException(BACKEND_ERROR, "Header If-Match required for patching an object")
 
-        response = self.get_response(method='PATCH', endpoint=endpoint, json=data, headers=headers)
+        response = self.get_response(method='PATCH', endpoint=endpoint, json=data, headers=headers,
+                                     timeout=timeout)
+        self._invalidate_cache(endpoint)
 
         if response.status_code == 200:
-            return self.decode(response=response)
+            return self.decode(response, self.codec, self._get_interner())
 
         if response.status_code == 412:
             # 412 means Precondition failed, but confirm ...
             if inception:
                 # update etag and retry to patch
-                resp = self.get(endpoint)
+                resp = self.get(endpoint, cache=False, timeout=timeout)
                 headers = {'If-Match': resp['_etag']}
-                return self.patch(endpoint, data=data, headers=headers, inception=False)
+                return self.patch(endpoint, data=data, headers=headers, inception=False,
+                                  timeout=timeout)
 
             raise BackendException(response.status_code, response.content)
         else:  # pragma: no cover - should never occur
             raise BackendException(response.status_code, response.content)
 
-    def put(self, endpoint, data, headers=None, inception=False):
+    def patch_many(self, items, concurrency=None, inception=True):
+        """
+        Update many items
+
+        Each item is provided as a tuple (endpoint, _etag, data) and it is patched as by the
+        `patch` function. The items are patched in parallel if concurrency is greater than 1.
+
+        If inception is True, an item which _etag changed (412 error) is got again to refresh
+        its _etag and it is patched again.
+
+        This method does not raise a BackendException, it returns the update result of each
+        item, in the provided items order. A result is the backend response for the item::
+
+            {u'_status': u'OK', u'_id': ..., u'_etag': ..., ...}
+
+        or an error::
+
+            {u'_status': u'ERR', u'_error': {u'code': 412, u'message': ...}}
+
+        :param items: (endpoint, _etag, data) of the items to update
+        :type items: list
+        :param concurrency: number of parallel requests, default is the client processes number
+        :type concurrency: int
+        :param inception: if True tries to get the last _etag
+        :type inception: bool
+        :return: list of the update results
+        :rtype: list
+        """
+        def patch_item(item):
+            """Patch an item and get its result"""
+            endpoint, etag, data = item
+            try:
+                return self.patch(endpoint, data, headers={'If-Match': etag}, inception=inception)
+            except BackendException as exp:
+                return self._get_error_result(exp)
+
+        return self._pool_map(patch_item, items, concurrency)
+
+    def put(self, endpoint, data, headers=None, inception=False, timeout=None):
+        # pylint: disable=too-many-arguments
         """
         Method to replace an item
 
@@ -648,30 +2638,36 @@ class Backend(object):  # pylint: disable=useless-object-inheritance
         :type headers: dict
         :param inception: if True tries to get the last _etag
         :type inception: bool
+        :param timeout: seconds, or (connect, read) tuple, to wait for the backend, default is
+        the client timeout
+        :type timeout: float or tuple
         :return: dictionary containing put response from the backend
         :rtype: dict
         """
         if not headers:
             raise BackendException(BACKEND_ERROR, "Header If-Match required for puting an object")
 
-        response = self.get_response(method='PUT', endpoint=endpoint, json=data, headers=headers)
+        response = self.get_response(method='PUT', endpoint=endpoint, json=data, headers=headers,
+                                     timeout=timeout)
+        self._invalidate_cache(endpoint)
 
         if response.status_code == 200:
-            return self.decode(response=response)
+            return self.decode(response, self.codec, self._get_interner())
 
         if response.status_code == 412:
             # 412 means Precondition failed, but confirm ...
             if inception:
                 # update etag and retry to patch
-                resp = self.get(endpoint)
+                resp = self.get(endpoint, cache=False, timeout=timeout)
                 headers = {'If-Match': resp['_etag']}
-                return self.patch(endpoint, data=data, headers=headers, inception=False)
+                return self.patch(endpoint, data=data, headers=headers, inception=False,
+                                  timeout=timeout)
 
             raise BackendException(response.status_code, response.content)
         else:  # pragma: no cover - should never occur
             raise BackendException(response.status_code, response.content)
 
-    def delete(self, endpoint, headers):
+    def delete(self, endpoint, headers, timeout=None):
         """
         Method to delete an item or all items
 
@@ -681,14 +2677,48 @@ class Backend(object):  # pylint: disable=useless-object-inheritance
         :type endpoint: str
         :param headers: headers (example: Content-Type)
         :type headers: dict
+        :param timeout: seconds, or (connect, read) tuple, to wait for the backend, default is
+        the client timeout
+        :type timeout: float or tuple
         :return: response (deletion information)
         :rtype: dict
         """
-        response = self.get_response(method='DELETE', endpoint=endpoint, headers=headers)
+        response = self.get_response(method='DELETE', endpoint=endpoint, headers=headers,
+                                     timeout=timeout)
+        self._invalidate_cache(endpoint)
 
         logger.debug("delete, response: %s", response)
         if response.status_code != 204:  # pragma: no cover - should not happen ...
-            resp = self.decode(response=response)
+            resp = self.decode(response, self.codec, self._get_interner())
 
         resp = {"_status": "OK"}
         return resp
+
+    def delete_many(self, items, concurrency=None):
+        """
+        Delete many items
+
+        Each item is provided as a tuple (endpoint, _etag) and it is deleted as by the
+        `delete` function. The items are deleted in parallel if concurrency is greater than 1.
+
+        This method does not raise a BackendException, it returns the deletion result of each
+        item, in the provided items order: {u'_status': u'OK'} or an error::
+
+            {u'_status': u'ERR', u'_error': {u'code': 412, u'message': ...}}
+
+        :param items: (endpoint, _etag) of the items to delete
+        :type items: list
+        :param concurrency: number of parallel requests, default is the client processes number
+        :type concurrency: int
+        :return: list of the deletion results
+        :rtype: list
+        """
+        def delete_item(item):
+            """Delete an item and get its result"""
+            endpoint, etag = item
+            try:
+                return self.delete(endpoint, headers={'If-Match': etag})
+            except BackendException as exp:
+                return self._get_error_result(exp)
+
+        return self._pool_map(delete_item, items, concurrency)
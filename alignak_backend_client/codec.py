@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (C) 2015-2018: AlignakBackend team, see AUTHORS.txt file for contributors
+#
+# This file is part of AlignakBackend.
+#
+# AlignakBackend is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# AlignakBackend is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with AlignakBackend.  If not, see <http://www.gnu.org/licenses/>.
+"""
+    Alignak REST backend client JSON codecs
+    =======================================
+
+    This module provides the JSON codecs used by the backend clients to encode the requests
+    body and to decode the backend responses.
+
+    The `orjson` and `ujson` libraries are much faster than the Python `json` module to parse
+    the large pages of items got from the backend. The fastest installed library is used,
+    else the Python `json` module::
+
+        codec = get_codec()          # fastest available codec
+        codec = get_codec('json')    # Python json module
+
+    All the codecs encode to UTF-8 bytes and decode bytes or strings.
+
+    An `Interner` may be provided to decode the documents with shared keys and shared values
+    for the fields referencing other items or holding states. Their equal strings are then
+    stored only once in memory, whatever the number of decoded items::
+
+        interner = Interner()
+        codec.loads(page1, interner=interner)
+        codec.loads(page2, interner=interner)
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover - optional dependency
+    ujson = None
+
+
+# Fields which values are shared by many items: links to other items and states
+INTERN_FIELDS = [
+    '_realm', '_templates', '_parent', 'host', 'service', 'parents', 'hostgroups',
+    'servicegroups', 'users', 'usergroups', 'check_command', 'event_handler',
+    'snapshot_command', 'check_period', 'notification_period', 'maintenance_period',
+    'snapshot_period', 'escalations', 'business_impact_modulations', 'checkmodulations',
+    'macromodulations', 'resultmodulations', 'initial_state', 'freshness_state',
+    'notification_options', 'flap_detection_options', 'stalking_options', 'poller_tag',
+    'reactionner_tag', 'imported_from', 'ls_state', 'ls_state_type', 'ls_last_state',
+    'ls_last_state_type'
+]
+
+
+class Interner(object):  # pylint: disable=useless-object-inheritance
+    """
+    Share the equal keys and hot values of the decoded documents
+
+    All the dictionaries keys are shared. The string values of the `fields` (and the strings
+    of their lists values) are shared. The other values, mostly distinct (_id, name, ...), are
+    not kept by the interner.
+    """
+    def __init__(self, fields=None):
+        """
+        Initialize an empty interner
+
+        :param fields: names of the fields which values are shared, default is INTERN_FIELDS
+        :type fields: list
+        """
+        self.fields = frozenset(INTERN_FIELDS if fields is None else fields)
+        self.keys = {}
+        self.values = {}
+
+    def _share(self, value):
+        """
+        Get the shared value equal to a field value
+
+        The strings of the lists are shared and the hot fields of the embedded documents too.
+
+        :param value: field value
+        :return: shared value
+        """
+        if isinstance(value, (str, type(u''))):
+            return self.values.setdefault(value, value)
+        if isinstance(value, list):
+            return [self._share(element) for element in value]
+        if isinstance(value, dict):
+            return self.intern(value, keys=False)
+        return value
+
+    def object_pairs_hook(self, pairs):
+        """
+        Build a dictionary with the shared keys and values, as a json object_pairs_hook
+
+        :param pairs: (key, value) pairs of a JSON object
+        :type pairs: list
+        :return: dictionary
+        :rtype: dict
+        """
+        keys = self.keys
+        fields = self.fields
+        result = {}
+        for key, value in pairs:
+            if key in fields:
+                value = self._share(value)
+            result[keys.setdefault(key, key)] = value
+        return result
+
+    def intern(self, data, keys=True):
+        """
+        Share the keys and values of a decoded document
+
+        The values are replaced in the document dictionaries. The dictionaries are copied to
+        share their keys, unless keys is False. Without sharing the keys, only the hot fields
+        are processed, along with the _items of a backend response, which is much faster.
+
+        :param data: decoded document
+        :param keys: False to not share the keys
+        :type keys: bool
+        :return: document
+        """
+        if isinstance(data, list):
+            return [self.intern(element, keys) for element in data]
+        if not isinstance(data, dict):
+            return data
+        if keys:
+            return self.object_pairs_hook([(key, self.intern(value))
+                                           for key, value in data.items()])
+        if '_items' in data:
+            data['_items'] = self.intern(data['_items'], keys)
+        for key in self.fields.intersection(data):
+            data[key] = self._share(data[key])
+        return data
+
+
+class JsonCodec(object):  # pylint: disable=useless-object-inheritance
+    """
+    Python json module codec
+    """
+    name = 'json'
+    available = True
+
+    def loads(self, data, interner=None):  # pylint: disable=no-self-use
+        """
+        Decode a JSON document
+
+        :param data: JSON document
+        :type data: bytes or str
+        :param interner: interner of the decoded keys and values
+        :type interner: Interner
+        :return: decoded object
+        """
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        if interner is not None:
+            return json.loads(data, object_pairs_hook=interner.object_pairs_hook)
+        return json.loads(data)
+
+    def dumps(self, data, indent=None, sort_keys=False):  # pylint: disable=no-self-use
+        """
+        Encode an object as a JSON document
+
+        :param data: object to encode
+        :param indent: indentation of the document, None for a compact document
+        :type indent: int
+        :param sort_keys: True to sort the dictionaries keys
+        :type sort_keys: bool
+        :return: UTF-8 encoded JSON document
+        :rtype: bytes
+        """
+        separators = (',', ': ') if indent else (',', ':')
+        return json.dumps(data, indent=indent, sort_keys=sort_keys,
+                          separators=separators).encode('utf-8')
+
+
+class UjsonCodec(JsonCodec):
+    """
+    ujson library codec
+    """
+    name = 'ujson'
+    available = ujson is not None
+
+    def loads(self, data, interner=None):
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        if interner is not None:
+            return interner.intern(ujson.loads(data))
+        return ujson.loads(data)
+
+    def dumps(self, data, indent=None, sort_keys=False):
+        return ujson.dumps(data, indent=indent or 0, sort_keys=sort_keys, ensure_ascii=False,
+                           escape_forward_slashes=False).encode('utf-8')
+
+
+class OrjsonCodec(JsonCodec):
+    """
+    orjson library codec
+
+    orjson only indents with 2 spaces, whatever the requested indentation.
+    """
+    name = 'orjson'
+    available = orjson is not None
+
+    def loads(self, data, interner=None):
+        if interner is not None:
+            # orjson already shares the keys
+            return interner.intern(orjson.loads(data), keys=False)
+        return orjson.loads(data)
+
+    def dumps(self, data, indent=None, sort_keys=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(data, option=option)
+
+
+# Codecs, from the fastest one
+CODECS = [OrjsonCodec, UjsonCodec, JsonCodec]
+
+
+def get_codec(name=None):
+    """
+    Get a JSON codec
+
+    :param name: codec name (orjson, ujson or json), None for the fastest available codec
+    :type name: str
+    :return: the codec or None if the requested codec is unknown or not installed
+    :rtype: JsonCodec
+    """
+    for codec in CODECS:
+        if codec.available and name in [None, codec.name]:
+            return codec()
+    return None
@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (C) 2015-2018: AlignakBackend team, see AUTHORS.txt file for contributors
+#
+# This file is part of AlignakBackend.
+#
+# AlignakBackend is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# AlignakBackend is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with AlignakBackend.  If not, see <http://www.gnu.org/licenses/>.
+"""
+    Alignak REST backend client compact items
+    ==========================================
+
+    This module provides a compact, columnar, storage for the many items got from the
+    backend with `Backend.get_all(..., compact=True)`.
+
+    A list of items dictionaries repeats the keys of each item in its hash table and holds a
+    different string object for each value decoded from the backend response, even when the
+    same _realm, check_command or timeperiod _id is shared by thousands of items. The
+    `CompactItems` store keeps one list per field instead (the items do not have a hash table
+    each) and the values of the fields that have few distinct values are shared by all the
+    items::
+
+        items = CompactItems(hosts)
+        len(items)                   # number of items
+        items[0]['name']             # an item is a dictionary-like record
+        dict(items[0])               # a real dictionary
+        items.column('_realm')       # the values of a field for all the items
+
+    The records are views on the store: modifying a record modifies the store. The list,
+    dictionary and strings values are the same objects as in the original items and they
+    must not be modified in place.
+
+    The `IdentityMap` shares the linked documents embedded in the items by the backend (eg.
+    the `check_period` timeperiod of the hosts got with an `embedded` parameter): all the
+    items linked to the same document hold the same dictionary::
+
+        documents = IdentityMap()
+        for host in backend.iter_all('host', params={'embedded': '{"check_period": 1}'}):
+            documents.share(host, ['check_period'])
+"""
+try:
+    from collections.abc import MutableMapping
+except ImportError:  # pragma: no cover - Python 2
+    from collections import MutableMapping
+
+# Maximum number of distinct values of a field whose values are shared
+POOL_SIZE = 1024
+
+
+class _Missing(object):  # pylint: disable=useless-object-inheritance,too-few-public-methods
+    """Value of a field missing in an item"""
+    def __repr__(self):
+        return '<missing>'
+
+
+MISSING = _Missing()
+
+
+class CompactRecord(MutableMapping):
+    """
+    Dictionary-like view on an item of a `CompactItems` store
+    """
+    __slots__ = ('_store', '_index')
+
+    def __init__(self, store, index):
+        """
+        Initialize an item view
+
+        :param store: items store
+        :type store: CompactItems
+        :param index: item index in the store
+        :type index: int
+        """
+        self._store = store
+        self._index = index
+
+    def __getitem__(self, key):
+        # pylint: disable=protected-access
+        value = self._store._columns[key][self._index]
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        # pylint: disable=protected-access
+        self._store._get_column(key)[self._index] = value
+
+    def __delitem__(self, key):
+        # pylint: disable=protected-access
+        column = self._store._columns[key]
+        if column[self._index] is MISSING:
+            raise KeyError(key)
+        column[self._index] = MISSING
+
+    def __iter__(self):
+        # pylint: disable=protected-access
+        for key, column in self._store._columns.items():
+            if column[self._index] is not MISSING:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class CompactItems(object):  # pylint: disable=useless-object-inheritance
+    """
+    Columnar storage of items
+
+    The store is a sequence of `CompactRecord`: it supports len, indexing and iteration. Use
+    `to_list` to get the items dictionaries back.
+    """
+    def __init__(self, items=None):
+        """
+        Initialize a store
+
+        :param items: items dictionaries stored
+        :type items: list
+        """
+        self._count = 0
+        # Field name -> values list, in the items order
+        self._columns = {}
+        # Field name -> shared values, None for a field with too many distinct values
+        self._pools = {}
+        if items is not None:
+            self.extend(items)
+
+    def _get_column(self, key):
+        """
+        Get the values list of a field, created if it does not exist
+
+        :param key: field name
+        :type key: str
+        :return: field values
+        :rtype: list
+        """
+        column = self._columns.get(key)
+        if column is None:
+            column = self._columns[key] = [MISSING] * self._count
+            self._pools[key] = {}
+        return column
+
+    def _share(self, key, value):
+        """
+        Get the shared object equal to a field value
+
+        Only the strings are shared, for the fields having at most POOL_SIZE distinct values.
+
+        :param key: field name
+        :type key: str
+        :param value: field value
+        :return: shared value
+        """
+        pool = self._pools[key]
+        if pool is None or not isinstance(value, (str, type(u''))):
+            return value
+        shared = pool.get(value)
+        if shared is not None:
+            return shared
+        if len(pool) >= POOL_SIZE:
+            # Too many distinct values (eg. _id), do not share this field values anymore
+            self._pools[key] = None
+            return value
+        pool[value] = value
+        return value
+
+    def append(self, item):
+        """
+        Store an item
+
+        :param item: item dictionary
+        :type item: dict
+        :return: None
+        """
+        for key, value in item.items():
+            self._get_column(key).append(self._share(key, value))
+        self._count += 1
+        if len(item) < len(self._columns):
+            for column in self._columns.values():
+                if len(column) < self._count:
+                    column.append(MISSING)
+
+    def extend(self, items):
+        """
+        Store items
+
+        :param items: items dictionaries
+        :type items: iterable
+        :return: None
+        """
+        for item in items:
+            self.append(item)
+
+    def column(self, key):
+        """
+        Get the values of a field for all the items, None for the items without this field
+
+        :param key: field name
+        :type key: str
+        :return: field values, in the items order
+        :rtype: list
+        """
+        column = self._columns.get(key)
+        if column is None:
+            return [None] * self._count
+        return [None if value is MISSING else value for value in column]
+
+    def keys(self):
+        """
+        Get the fields names of the stored items
+
+        :return: fields names
+        :rtype: list
+        """
+        return list(self._columns)
+
+    def to_list(self):
+        """
+        Get the items dictionaries
+
+        :return: items
+        :rtype: list
+        """
+        return [dict(record) for record in self]
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [CompactRecord(self, position)
+                    for position in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('item index out of range')
+        return CompactRecord(self, index)
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield CompactRecord(self, index)
+
+    def __repr__(self):
+        return '<CompactItems: %d items, %d fields>' % (self._count, len(self._columns))
+
+
+class IdentityMap(object):  # pylint: disable=useless-object-inheritance
+    """
+    Shared embedded documents, identified by their _id and _etag
+
+    A document is only replaced with an equal one: the same _id with another _etag is a
+    different version of the document, both versions are kept.
+    """
+    def __init__(self):
+        """
+        Initialize an empty identity map
+        """
+        # (_id, _etag) -> shared document
+        self._documents = {}
+
+    def canonical(self, document):
+        """
+        Get the shared document equal to a document
+
+        The first document got for an _id and _etag becomes the shared document. The values
+        that are not documents (eg. a not embedded link _id) are returned unchanged.
+
+        :param document: embedded document
+        :type document: dict
+        :return: shared document
+        :rtype: dict
+        """
+        if not isinstance(document, dict) or '_id' not in document:
+            return document
+        return self._documents.setdefault((document['_id'], document.get('_etag')), document)
+
+    def share(self, item, fields):
+        """
+        Replace the embedded documents of an item with the shared documents
+
+        :param item: item dictionary, updated in place
+        :type item: dict
+        :param fields: fields of the embedded documents, a field may be a list of documents
+        :type fields: list
+        :return: the item
+        :rtype: dict
+        """
+        for field in fields:
+            value = item.get(field)
+            if isinstance(value, list):
+                item[field] = [self.canonical(document) for document in value]
+            elif value:
+                item[field] = self.canonical(value)
+        return item
+
+    def __len__(self):
+        return len(self._documents)
+
+    def __repr__(self):
+        return '<IdentityMap: %d documents>' % len(self._documents)
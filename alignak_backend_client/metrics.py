@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (C) 2015-2018: AlignakBackend team, see AUTHORS.txt file for contributors
+#
+# This file is part of AlignakBackend.
+#
+# AlignakBackend is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# AlignakBackend is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with AlignakBackend.  If not, see <http://www.gnu.org/licenses/>.
+"""
+    Alignak REST backend client requests instrumentation
+    ====================================================
+
+    This module provides the hooks called by the backend client for each request and a
+    metrics collector built on these hooks.
+
+    Subclass `RequestHooks` and append an instance to the `Backend.hooks` list to be notified
+    before each request is sent, after each response is received or when a request fails::
+
+        class SlowRequests(RequestHooks):
+            def after_response(self, method, endpoint, sent, response, elapsed):
+                if elapsed > 1:
+                    print("%s %s took %.1fs" % (method, endpoint, elapsed))
+
+        backend.hooks.append(SlowRequests())
+
+    The `MetricsCollector` is registered by default. Its statistics are included in the
+    `Backend.stats` snapshot.
+"""
+import threading
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+
+class RequestHooks(object):  # pylint: disable=useless-object-inheritance
+    """
+    Requests hooks interface, the default hooks do nothing
+
+    The hooks are called in the thread sending the request. With the process executor, the
+    hooks are called in the forked processes and their effects are not seen by the parent
+    process.
+    """
+    def before_request(self, method, endpoint, sent):
+        """
+        Called before a request is sent
+
+        :param method: HTTP method
+        :type method: str
+        :param endpoint: endpoint (API URL) relative from root endpoint
+        :type endpoint: str
+        :param sent: size of the request body, in bytes
+        :type sent: int
+        :return: None
+        """
+
+    def after_response(self, method, endpoint, sent, response, elapsed):
+        # pylint: disable=too-many-arguments
+        """
+        Called after a response is received, whatever its status code
+
+        :param method: HTTP method
+        :type method: str
+        :param endpoint: endpoint (API URL) relative from root endpoint
+        :type endpoint: str
+        :param sent: size of the request body, in bytes
+        :type sent: int
+        :param response: backend response
+        :type response: requests.Response
+        :param elapsed: time spent for the request, including the retries, in seconds
+        :type elapsed: float
+        :return: None
+        """
+
+    def on_error(self, method, endpoint, sent, exception, elapsed):
+        # pylint: disable=too-many-arguments
+        """
+        Called when a request did not get a response
+
+        :param method: HTTP method
+        :type method: str
+        :param endpoint: endpoint (API URL) relative from root endpoint
+        :type endpoint: str
+        :param sent: size of the request body, in bytes
+        :type sent: int
+        :param exception: raised exception
+        :type exception: BackendException
+        :param elapsed: time spent for the request, including the retries, in seconds
+        :type elapsed: float
+        :return: None
+        """
+
+
+class MetricsCollector(RequestHooks):
+    """
+    In-memory requests metrics, per resource (eg. host for host/5a...) and HTTP method
+
+    For each resource and method, the collector counts the requests, the errors (requests
+    without response), the responses status codes, the bytes sent and received and the
+    retries. The latency is recorded in a cumulative histogram whose buckets are counting
+    the requests that lasted at most LATENCY_BUCKETS seconds.
+    """
+    def __init__(self, buckets=None):
+        """
+        Initialize an empty collector
+
+        :param buckets: latency histogram buckets upper bounds, default is LATENCY_BUCKETS
+        :type buckets: list
+        """
+        self.buckets = sorted(buckets or LATENCY_BUCKETS)
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_resource(endpoint):
+        """
+        Get the resource name of an endpoint
+
+        :param endpoint: endpoint (API URL) relative from root endpoint
+        :type endpoint: str
+        :return: resource name, / for the root endpoint
+        :rtype: str
+        """
+        return endpoint.split('?')[0].split('/')[0] or '/'
+
+    def _record(self, method, endpoint, sent, elapsed, status=None, received=0, retries=0):
+        # pylint: disable=too-many-arguments
+        """
+        Record a request
+
+        :param method: HTTP method
+        :type method: str
+        :param endpoint: endpoint (API URL) relative from root endpoint
+        :type endpoint: str
+        :param sent: size of the request body, in bytes
+        :type sent: int
+        :param elapsed: time spent for the request, in seconds
+        :type elapsed: float
+        :param status: response status code, None if the request did not get a response
+        :type status: int
+        :param received: size of the response body, in bytes
+        :type received: int
+        :param retries: number of retries of the request
+        :type retries: int
+        :return: None
+        """
+        key = (self.get_resource(endpoint), method)
+        with self._lock:
+            metrics = self._metrics.get(key)
+            if metrics is None:
+                metrics = self._metrics[key] = {
+                    'count': 0, 'errors': 0, 'status': {}, 'sent': 0, 'received': 0,
+                    'retries': 0, 'latency_sum': 0.0, 'latency_max': 0.0,
+                    'latency_buckets': [0] * (len(self.buckets) + 1)
+                }
+            metrics['count'] += 1
+            if status is None:
+                metrics['errors'] += 1
+            else:
+                metrics['status'][status] = metrics['status'].get(status, 0) + 1
+            metrics['sent'] += sent
+            metrics['received'] += received
+            metrics['retries'] += retries
+            metrics['latency_sum'] += elapsed
+            metrics['latency_max'] = max(metrics['latency_max'], elapsed)
+            index = len(self.buckets)
+            for bucket, bound in enumerate(self.buckets):
+                if elapsed <= bound:
+                    index = bucket
+                    break
+            metrics['latency_buckets'][index] += 1
+
+    def after_response(self, method, endpoint, sent, response, elapsed):
+        # pylint: disable=too-many-arguments
+        retries = 0
+        if hasattr(response.raw, 'tell'):
+            # Bytes read from the connection, before decompression
+            received = response.raw.tell()
+        else:
+            received = len(response.content)
+        if getattr(response.raw, 'retries', None) is not None:
+            retries = len(response.raw.retries.history)
+        self._record(method, endpoint, sent, elapsed, status=response.status_code,
+                     received=received, retries=retries)
+
+    def on_error(self, method, endpoint, sent, exception, elapsed):
+        # pylint: disable=too-many-arguments
+        self._record(method, endpoint, sent, elapsed)
+
+    def reset(self):
+        """
+        Forget all the recorded requests
+
+        :return: None
+        """
+        with self._lock:
+            self._metrics = {}
+
+    def reset_lock(self):
+        """
+        Get a new lock, in a forked process (see `Backend._init_process`)
+
+        :return: None
+        """
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        """
+        Get the metrics of the recorded requests, per resource and method::
+
+            {
+                'host': {
+                    'GET': {
+                        'count': 12, 'errors': 0, 'status': {200: 11, 404: 1},
+                        'sent': 0, 'received': 150000, 'retries': 1,
+                        'latency': {'mean': 0.02, 'max': 0.1,
+                                    'buckets': [(0.005, 0), (0.01, 3), ..., ('+Inf', 12)]}
+                    },
+                    'POST': {...}
+                },
+                ...
+            }
+
+        The latency buckets are cumulative: each one counts the requests that lasted at most
+        its upper bound, in seconds.
+
+        :return: requests metrics
+        :rtype: dict
+        """
+        stats = {}
+        with self._lock:
+            for (resource, method), metrics in self._metrics.items():
+                cumulated = 0
+                buckets = []
+                for bound, count in zip(self.buckets + ['+Inf'], metrics['latency_buckets']):
+                    cumulated += count
+                    buckets.append((bound, cumulated))
+                stats.setdefault(resource, {})[method] = {
+                    'count': metrics['count'],
+                    'errors': metrics['errors'],
+                    'status': dict(metrics['status']),
+                    'sent': metrics['sent'],
+                    'received': metrics['received'],
+                    'retries': metrics['retries'],
+                    'latency': {'mean': metrics['latency_sum'] / metrics['count'],
+                                'max': metrics['latency_max'],
+                                'buckets': buckets}
+                }
+        return stats
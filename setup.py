@@ -41,6 +41,14 @@ setup(
 
     # Dependencies (if some) ...
     install_requires=['requests', 'future'],
+    extras_require={
+        # asyncio client (Python 3.5+)
+        'async': ['aiohttp'],
+        # fast JSON codec
+        'fastjson': ['orjson; python_version >= "3.6"', 'ujson; python_version < "3.6"'],
+        # streamed responses decoding
+        'stream': ['ijson>=3.1; python_version >= "3.5"'],
+    },
 
     entry_points={
         'console_scripts': [
@@ -7,6 +7,7 @@
 from __future__ import print_function
 
 import os
+import json
 import shlex
 import subprocess
 import time
@@ -426,6 +427,44 @@ class TestAlignakBackendCli(unittest2.TestCase):
             print("Exists %s?" % filename)
             assert os.path.exists(os.path.join(work_dir, filename))
 
+        print("Getting only some fields...")
+        exit_code = subprocess.call(shlex.split(
+            'python ../alignak_backend_client/backend_client.py -f "%s" -t realm '
+            '-F "name,_level" list' % work_dir
+        ))
+        assert exit_code == 0
+        with open(os.path.join(work_dir, 'alignak-object-list-realms.json')) as dump:
+            realms = json.load(dump)
+        assert realms
+        for realm in realms:
+            assert 'name' in realm
+            assert '_level' in realm
+            assert '_parent' not in realm
+
+        print("Getting embedded items once...")
+        exit_code = subprocess.call(shlex.split(
+            'python ../alignak_backend_client/backend_client.py -f "%s" -t timeperiod '
+            '-e list' % work_dir
+        ))
+        assert exit_code == 0
+        with open(os.path.join(work_dir, 'alignak-object-list-timeperiods.json')) as dump:
+            timeperiods = json.load(dump)
+        assert timeperiods
+        for timeperiod in timeperiods:
+            assert timeperiod['_realm'] == timeperiods[0]['_realm']
+            assert 'name' in timeperiod['_realm']
+        exit_code = subprocess.call(shlex.split(
+            'python ../alignak_backend_client/backend_client.py -f "%s" -t timeperiod '
+            '-e -r list' % work_dir
+        ))
+        assert exit_code == 0
+        with open(os.path.join(work_dir, 'alignak-object-list-timeperiods.json')) as dump:
+            references = json.load(dump)
+        assert len(references['_items']) == len(timeperiods)
+        assert len(references['_embedded']) == 1
+        for timeperiod in references['_items']:
+            assert references['_embedded'][timeperiod['_realm']] == timeperiods[0]['_realm']
+
     def test_start_04_update(self):
         # pylint: disable=no-self-use
         """ CLI to create backend objects"""
@@ -0,0 +1,17 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+Helpers shared by the alignak_backend_client tests
+"""
+
+
+def get_commands(prefix, realm_id, count):
+    """Get the data of some numbered commands to create in the backend
+
+    :param prefix: prefix of the commands names
+    :param realm_id: _id of the commands realm
+    :param count: number of commands
+    :return: list of the commands data
+    """
+    return [{'name': '%s %d' % (prefix, num), 'command_line': 'check_ping',
+             '_realm': realm_id} for num in range(count)]
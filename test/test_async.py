@@ -0,0 +1,160 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+Test the asyncio client (AsyncBackend) with the backend
+"""
+
+from __future__ import print_function
+import os
+import sys
+import time
+import shlex
+import subprocess
+import unittest2
+from nose.tools import assert_true, assert_false, assert_equal, assert_raises
+from alignak_backend_client.client import BackendException, BACKEND_PAGINATION_PROBE
+
+
+@unittest2.skipIf(sys.version_info < (3, 5), "asyncio client requires Python 3.5+")
+class TestAsyncClient(unittest2.TestCase):
+    """
+    Test the asyncio client
+    """
+    @classmethod
+    def setUpClass(cls):
+        """
+        Function used in the beginning of test to prepare the backend
+
+        :param module:
+        :return: None
+        """
+        print("start alignak backend")
+
+        cls.backend_address = "http://localhost:5000"
+
+        # Set DB name for tests
+        os.environ['ALIGNAK_BACKEND_MONGO_DBNAME'] = 'alignak-backend-test'
+
+        # Delete used mongo DBs
+        exit_code = subprocess.call(
+            shlex.split(
+                'mongo %s --eval "db.dropDatabase()"' % os.environ['ALIGNAK_BACKEND_MONGO_DBNAME'])
+        )
+        assert exit_code == 0
+
+        cls.pid = subprocess.Popen([
+            'uwsgi', '--plugin', 'python', '-w', 'alignakbackend:app',
+            '--socket', '0.0.0.0:5000', '--protocol=http', '--enable-threads', '--pidfile',
+            '/tmp/uwsgi.pid'
+        ])
+        time.sleep(3)
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Stop the backend at the end of the tests
+
+        :param module:
+        :return: None
+        """
+        print("stop alignak backend")
+        cls.pid.kill()
+
+    def test_1_login_get_all(self):
+        """
+        Login, create many items concurrently and get them all
+
+        :return: None
+        """
+        import asyncio
+        from alignak_backend_client.async_client import AsyncBackend
+
+        loop = asyncio.new_event_loop()
+        backend = AsyncBackend(self.backend_address, concurrency=20)
+
+        print("invalid username/password, login refused")
+        assert_false(loop.run_until_complete(backend.login('admin', 'bad_password')))
+        assert_false(backend.authenticated)
+
+        assert_true(loop.run_until_complete(backend.login('admin', 'admin')))
+        assert_true(backend.authenticated)
+
+        items = loop.run_until_complete(backend.get('realm'))
+        realm_id = items['_items'][0]['_id']
+
+        # Create 200 hostgroups concurrently
+        posts = []
+        for num in range(200):
+            posts.append(backend.post('hostgroup', {'name': 'async group %d' % num,
+                                                    '_realm': realm_id}))
+        responses = loop.run_until_complete(asyncio.gather(*posts))
+        for response in responses:
+            assert_equal(response['_status'], 'OK')
+
+        # Get all the pages concurrently
+        items = loop.run_until_complete(backend.get_all('hostgroup', {'max_results': 10}))
+        assert_equal(items['_status'], 'OK')
+        # 200 groups and the default one
+        assert_equal(len(items['_items']), 201)
+        assert_equal(len(set([item['_id'] for item in items['_items']])), 201)
+
+        # Discover the backend page size
+        assert_equal(backend._get_page_size('hostgroup'), BACKEND_PAGINATION_PROBE)
+        items = loop.run_until_complete(backend.get_all('hostgroup'))
+        assert_equal(len(items['_items']), 201)
+        page_size = backend._get_page_size('hostgroup')
+        assert_true(page_size < BACKEND_PAGINATION_PROBE)
+        assert_equal(backend._get_page_size('host'), BACKEND_PAGINATION_PROBE)
+
+        # Patch with a bad etag and inception
+        item = items['_items'][1]
+        response = loop.run_until_complete(
+            backend.patch('hostgroup/%s' % item['_id'], {'alias': 'patched'},
+                          headers={'If-Match': 'bad'}, inception=True))
+        assert_equal(response['_status'], 'OK')
+
+        # Patch with a bad etag and no inception
+        with assert_raises(BackendException) as cm:
+            loop.run_until_complete(
+                backend.patch('hostgroup/%s' % item['_id'], {'alias': 'patched'},
+                              headers={'If-Match': 'bad'}))
+        assert_equal(cm.exception.code, 412)
+
+        # Get an unknown item
+        with assert_raises(BackendException) as cm:
+            loop.run_until_complete(backend.get('hostgroup/5a0000000000000000000000'))
+        assert_equal(cm.exception.code, 404)
+
+        assert_true(loop.run_until_complete(backend.logout()))
+        loop.close()
+
+    def test_2_connection_error(self):
+        """
+        Backend connection error
+
+        :return: None
+        """
+        import asyncio
+        from alignak_backend_client.async_client import AsyncBackend
+
+        loop = asyncio.new_event_loop()
+        backend = AsyncBackend('http://localhost:5001')
+
+        with assert_raises(BackendException) as cm:
+            loop.run_until_complete(backend.login('admin', 'admin'))
+        assert_equal(cm.exception.code, 1000)
+
+        loop.run_until_complete(backend.close())
+
+        # Retried connection errors
+        backend = AsyncBackend('http://localhost:5001', connect_timeout=1, retries=3,
+                               retry_backoff=0.2, retry_jitter=0)
+        start = time.time()
+        with assert_raises(BackendException) as cm:
+            loop.run_until_complete(backend.get('hostgroup'))
+        assert_equal(cm.exception.code, 1000)
+        # No delay before the first retry, then 0.4 and 0.8 seconds
+        assert_true(time.time() - start >= 1.2)
+
+        loop.run_until_complete(backend.close())
+        loop.close()
@@ -0,0 +1,136 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+Test the JSON codecs
+"""
+
+from __future__ import print_function
+import os
+import json
+import time
+import unittest2
+from nose.tools import assert_true, assert_equal, assert_is_none
+from alignak_backend_client.codec import get_codec, CODECS, Interner
+
+
+class TestCodec(unittest2.TestCase):
+    """
+    Test the JSON codecs
+    """
+    @classmethod
+    def setUpClass(cls):
+        """
+        Build a page of 50 hosts as the backend returns it
+
+        :return: None
+        """
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'json',
+                            'checks-pack-hosts-templates.json')
+        with open(path) as json_file:
+            template = json.load(json_file)[0]
+
+        items = []
+        for num in range(50):
+            item = dict(template)
+            item.update({'_id': '5a%022x' % num, '_etag': '%040x' % num,
+                         '_created': 'Thu, 01 Mar 2018 10:00:00 GMT',
+                         '_updated': 'Thu, 01 Mar 2018 10:00:00 GMT',
+                         'name': u'host %d - è' % num, '_is_template': False,
+                         '_realm': '5a%022x' % 1, '_templates': ['5a%022x' % 2],
+                         'check_command': {'_id': '5a%022x' % 3, 'name': 'check_ping',
+                                           '_realm': '5a%022x' % 1}})
+            items.append(item)
+        cls.page = {'_items': items,
+                    '_links': {'self': {'href': 'host', 'title': 'host'},
+                               'next': {'href': 'host?page=2', 'title': 'next page'}},
+                    '_meta': {'page': 1, 'max_results': 50, 'total': 5000}}
+        cls.content = json.dumps(cls.page).encode('utf-8')
+
+    def test_1_codecs(self):
+        """
+        Encode and decode with all the available codecs
+
+        :return: None
+        """
+        assert_equal(get_codec('json').name, 'json')
+        assert_is_none(get_codec('unknown'))
+        # Fastest available codec
+        assert_true(get_codec().name in [codec.name for codec in CODECS if codec.available])
+
+        for codec in CODECS:
+            if not codec.available:
+                continue
+            codec = codec()
+            print("Codec: %s" % codec.name)
+            assert_equal(codec.loads(self.content), self.page)
+            assert_equal(codec.loads(self.content.decode('utf-8')), self.page)
+            dump = codec.dumps(self.page)
+            assert_true(isinstance(dump, bytes))
+            assert_equal(json.loads(dump.decode('utf-8')), self.page)
+            dump = codec.dumps({'b': 1, 'a': [1, 2]}, indent=4, sort_keys=True)
+            assert_true(dump.decode('utf-8').index('"a"') < dump.decode('utf-8').index('"b"'))
+            assert_equal(json.loads(dump.decode('utf-8')), {'b': 1, 'a': [1, 2]})
+
+    def test_2_benchmark(self):
+        """
+        Compare the codecs on 50 hosts pages
+
+        :return: None
+        """
+        loops = 200
+        timings = {}
+        for codec in CODECS:
+            if not codec.available:
+                continue
+            codec = codec()
+            start = time.time()
+            for _ in range(loops):
+                codec.loads(self.content)
+            decoding = time.time() - start
+            start = time.time()
+            for _ in range(loops):
+                codec.dumps(self.page)
+            encoding = time.time() - start
+            timings[codec.name] = decoding
+            print("%s: decode %.2f ms, encode %.2f ms per page of %d bytes"
+                  % (codec.name, decoding * 1000 / loops, encoding * 1000 / loops,
+                     len(self.content)))
+
+        # The fastest codec is not slower than the Python json module
+        fastest = get_codec().name
+        print("Decoding gain of %s: x%.1f" % (fastest, timings['json'] / timings[fastest]))
+        assert_true(timings[fastest] <= timings['json'] * 1.5)
+
+    def test_3_interner(self):
+        """
+        Decode with shared keys and values
+
+        :return: None
+        """
+        for codec in CODECS:
+            if not codec.available:
+                continue
+            codec = codec()
+            print("Codec: %s" % codec.name)
+            interner = Interner()
+            items = codec.loads(self.content, interner=interner)['_items']
+            items.extend(codec.loads(self.content, interner=interner)['_items'])
+            assert_equal(items, self.page['_items'] * 2)
+
+            first, last = items[0], items[-1]
+            # Hot fields values are shared, even in the embedded documents
+            assert_true(first['_realm'] is last['_realm'])
+            assert_true(first['_templates'][0] is last['_templates'][0])
+            assert_true(first['check_command']['_realm'] is first['_realm'])
+            # Other values are not shared
+            assert_true(first['_etag'] is not items[50]['_etag'])
+            assert_true('host 0 - è' not in interner.values)
+
+        # Configured fields
+        interner = Interner(fields=['name'])
+        items = get_codec('json').loads(self.content, interner=interner)['_items']
+        assert_true(items[0]['_realm'] is not items[1]['_realm'])
+        # Keys are shared
+        assert_true([key for key in items[0] if key == '_realm'][0] is
+                    [key for key in items[1] if key == '_realm'][0])
+        assert_equal(len(interner.values), 51)
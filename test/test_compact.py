@@ -0,0 +1,142 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+Test the compact items store
+"""
+
+from __future__ import print_function
+import os
+import gc
+import json
+import unittest2
+from nose.tools import assert_true, assert_equal, assert_raises
+from alignak_backend_client.compact import CompactItems, IdentityMap
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+
+class TestCompact(unittest2.TestCase):
+    """
+    Test the compact items store
+    """
+    @classmethod
+    def setUpClass(cls):
+        """
+        Build pages of hosts as the backend returns them
+
+        :return: None
+        """
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'json',
+                            'checks-pack-hosts-templates.json')
+        with open(path) as json_file:
+            cls.template = json.load(json_file)[0]
+
+        cls.pages = []
+        for page in range(100):
+            items = []
+            for num in range(page * 50, (page + 1) * 50):
+                item = dict(cls.template)
+                item.update({'_id': '5a%022x' % num, '_etag': '%040x' % num,
+                             '_created': 'Thu, 01 Mar 2018 10:00:00 GMT',
+                             '_updated': 'Thu, 01 Mar 2018 10:00:00 GMT',
+                             '_realm': '5a%022x' % 1, 'name': u'host %d - è' % num,
+                             '_is_template': False})
+                items.append(item)
+            cls.pages.append(json.dumps({'_items': items}))
+
+    def test_1_records(self):
+        """
+        Store items and access them as dictionaries
+
+        :return: None
+        """
+        items = [{'_id': '1', 'name': 'host1', 'tags': ['a']},
+                 {'_id': '2', 'name': 'host2', 'alias': 'Host 2'},
+                 {'_id': '3', 'name': 'host3', 'tags': []}]
+        compact = CompactItems(items)
+        assert_equal(len(compact), 3)
+        assert_equal(sorted(compact.keys()), ['_id', 'alias', 'name', 'tags'])
+        assert_equal(compact.to_list(), items)
+        assert_equal([dict(record) for record in compact], items)
+        assert_equal(compact[1], items[1])
+        assert_equal(compact[-1], items[-1])
+        assert_equal(compact[1:], items[1:])
+        assert_equal(compact.column('alias'), [None, 'Host 2', None])
+        with assert_raises(IndexError):
+            compact[3]
+
+        record = compact[0]
+        assert_equal(record['name'], 'host1')
+        assert_equal(record.get('alias'), None)
+        assert_equal(record.get('alias', 'none'), 'none')
+        assert_true('tags' in record)
+        assert_true('alias' not in record)
+        assert_equal(len(record), 3)
+        with assert_raises(KeyError):
+            record['alias']
+
+        # Records are views on the store
+        record['alias'] = 'Host 1'
+        record['notes'] = 'notes'
+        del record['tags']
+        assert_equal(dict(compact[0]), {'_id': '1', 'name': 'host1', 'alias': 'Host 1',
+                                        'notes': 'notes'})
+        assert_equal(compact.column('notes'), ['notes', None, None])
+        compact.append({'_id': '4'})
+        assert_equal(dict(compact[3]), {'_id': '4'})
+
+    @unittest2.skipIf(tracemalloc is None, "tracemalloc is not available")
+    def test_2_memory(self):
+        """
+        Compare the memory used by the items dictionaries and the compact store
+
+        :return: None
+        """
+        sizes = {}
+        for compact in [False, True]:
+            gc.collect()
+            tracemalloc.start()
+            items = CompactItems() if compact else []
+            for page in self.pages:
+                items.extend(json.loads(page)['_items'])
+            sizes[compact] = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            assert_equal(len(items), 5000)
+            del items
+
+        wire = sum(len(page) for page in self.pages)
+        print("5000 hosts, %d bytes: %d bytes as dictionaries, %d bytes compact, gain x%.1f"
+              % (wire, sizes[False], sizes[True], float(sizes[False]) / sizes[True]))
+        assert_true(sizes[True] * 2 < sizes[False])
+
+    def test_3_identity_map(self):
+        """
+        Share the embedded documents of the items
+
+        :return: None
+        """
+        documents = IdentityMap()
+        period = {'_id': '5a01', '_etag': 'e1', 'name': '24x7'}
+        hosts = []
+        for num in range(3):
+            host = {'_id': '5b%02d' % num, 'name': 'host %d' % num,
+                    'check_period': dict(period), 'users': [dict(period), 'not-embedded'],
+                    'event_handler': None}
+            hosts.append(documents.share(host, ['check_period', 'users', 'event_handler',
+                                                'unknown']))
+        assert_equal(len(documents), 1)
+        assert_equal(hosts[0]['check_period'], period)
+        assert_true(hosts[0]['check_period'] is hosts[2]['check_period'])
+        assert_true(hosts[1]['users'][0] is hosts[0]['check_period'])
+        assert_equal(hosts[1]['users'][1], 'not-embedded')
+        assert_true(hosts[1]['event_handler'] is None)
+        assert_true('unknown' not in hosts[1])
+
+        # Another version of the document is not shared
+        updated = dict(period, _etag='e2', name='always')
+        assert_true(documents.canonical(updated) is updated)
+        assert_true(documents.canonical(dict(period)) is hosts[0]['check_period'])
+        assert_equal(len(documents), 2)
@@ -11,8 +11,9 @@ import shlex
 import subprocess
 import requests
 import unittest2
-from nose.tools import assert_true, assert_raises
+from nose.tools import assert_true, assert_equal, assert_raises
 from alignak_backend_client.client import Backend, BackendException
+from helpers import get_commands
 
 
 class TestDeleteClient(unittest2.TestCase):
@@ -104,6 +105,37 @@ class TestDeleteClient(unittest2.TestCase):
         response = backend.delete('/'.join(['timeperiod', timeperiod_id]), headers=headers)
         assert_true(response['_status'] == 'OK')
 
+    def test_1_delete_many(self):
+        """
+        Test delete many commands, some with a bad _etag
+
+        :return: None
+        """
+        backend = Backend(self.backend_address)
+        backend.login('admin', 'admin')
+
+        commands = get_commands('deleted command', self.realmAll_id, 20)
+        results = backend.post_many('command', commands)
+
+        items = []
+        for num, result in enumerate(results):
+            etag = 'bad etag' if num in [2, 13] else result['_etag']
+            items.append(('command/%s' % result['_id'], etag))
+
+        results = backend.delete_many(items, concurrency=4)
+        assert_equal(len(results), 20)
+        for num, result in enumerate(results):
+            if num in [2, 13]:
+                assert_equal(result['_status'], 'ERR')
+                assert_equal(result['_error']['code'], 412)
+            else:
+                assert_equal(result['_status'], 'OK')
+                with assert_raises(BackendException) as cm:
+                    backend.get(items[num][0])
+                assert_equal(cm.exception.code, 404)
+
+        backend.logout()
+
     def test_2_delete_exceptions(self):
         """
         Test delete a timeperiod with errors (so exceptions)
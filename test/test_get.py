@@ -6,13 +6,23 @@ Test the GET request (get items of resource/endpoint) in the backend
 
 from __future__ import print_function
 import os
+import io
+import gc
+import weakref
+import json
 import time
+import zlib
+import threading
 import shlex
 import subprocess
 import requests
 import unittest2
+from urllib3.exceptions import ReadTimeoutError
 from nose.tools import assert_true, assert_equal, assert_raises
-from alignak_backend_client.client import Backend, BackendException
+from alignak_backend_client.metrics import RequestHooks
+from alignak_backend_client.client import Backend, BackendException, BACKEND_PAGINATION_PROBE, \
+    PAGINATION_KEYSET, EXECUTOR_THREAD, BACKEND_TIMEOUT, BACKEND_ERROR, BACKEND_UNAVAILABLE, \
+    ETAG_CACHE_SIZE, PAGINATION_PAGE
 
 
 class TestGetClient(unittest2.TestCase):
@@ -126,6 +136,680 @@ class TestGetClient(unittest2.TestCase):
             print("Group: %s" % hostgroup['name'])
         self.assertEqual(len(hostgroups), 101)
 
+    def test_2_intern(self):
+        """
+        Get all items of a resource with shared keys and values
+
+        :return: None
+        """
+        print('get all elements with shared keys and values')
+
+        # Create client API
+        backend = Backend(self.backend_address)
+        backend.login('admin', 'admin')
+        hostgroups = backend.get_all('hostgroup', params={'max_results': 10})['_items']
+        backend.logout()
+
+        backend = Backend(self.backend_address, intern=True)
+        backend.login('admin', 'admin')
+        interned = backend.get_all('hostgroup', params={'max_results': 10})['_items']
+        self.assertEqual(interned, hostgroups)
+        self.assertTrue(interned[0]['_realm'] is interned[-1]['_realm'])
+
+        # Each call shares the values of its own items, the client does not keep them
+        interners = []
+        get_interner = backend._get_interner
+
+        def record_interner():
+            """Record the interners of the calls"""
+            interner = get_interner()
+            interners.append(weakref.ref(interner))
+            return interner
+
+        backend._get_interner = record_interner
+        for _ in range(3):
+            backend.get_all('hostgroup', params={'max_results': 10})
+            list(backend.iter_all('hostgroup', params={'max_results': 10}))
+        del interned
+        gc.collect()
+        self.assertEqual(len(interners), 6)
+        self.assertEqual([interner() for interner in interners], [None] * 6)
+        backend.logout()
+
+    def test_2_compact(self):
+        """
+        Get all items of a resource in a compact store
+
+        :return: None
+        """
+        print('get all elements in a compact store')
+
+        # Create client API
+        backend = Backend(self.backend_address)
+        backend.login('admin', 'admin')
+        hostgroups = backend.get_all('hostgroup', params={'max_results': 10})['_items']
+
+        for processes in [1, 4]:
+            backend.processes = processes
+            compact = backend.get_all('hostgroup', params={'max_results': 10}, compact=True)
+            self.assertEqual(len(compact['_items']), 101)
+            # The processes return the pages in any order
+            self.assertEqual(sorted(compact['_items'].to_list(), key=lambda item: item['_id']),
+                             sorted(hostgroups, key=lambda item: item['_id']))
+            self.assertEqual(compact['_items'].column('name'),
+                             [item['name'] for item in compact['_items']])
+        backend.logout()
+
+    def test_2_all_pages_page_size(self):
+        """
+        Get all items with the page size discovered from the backend or configured
+
+        :return: None
+        """
+        print('get all elements with the backend page size')
+
+        # Create client API
+        backend = Backend(self.backend_address)
+        backend.login('admin', 'admin')
+
+        # First request probes the backend pagination limit
+        assert_equal(backend._get_page_size('hostgroup'), BACKEND_PAGINATION_PROBE)
+        items = backend.get_all('hostgroup')
+        self.assertEqual(len(items['_items']), 101)
+        page_size = backend._get_page_size('hostgroup')
+        assert_true(page_size <= BACKEND_PAGINATION_PROBE)
+        # Other endpoints are not concerned
+        assert_equal(backend._get_page_size('host'), BACKEND_PAGINATION_PROBE)
+
+        # Configured page size
+        backend = Backend(self.backend_address, page_size=10)
+        backend.login('admin', 'admin')
+        assert_equal(backend._get_page_size('hostgroup'), 10)
+        pages = list(backend.iter_all('hostgroup', pages=True))
+        self.assertEqual(len(pages), 11)
+
+    def test_2_iter_all_pages(self):
+        """
+        Iterate over all items (so all pages) of a resource
+
+        :return: None
+        """
+        print('iterate over all elements on an endpoint')
+
+        # Create client API
+        backend = Backend(self.backend_address)
+        backend.login('admin', 'admin')
+
+        # Iterate over all the items
+        params = {'max_results': 3}
+        names = [hostgroup['name'] for hostgroup in backend.iter_all('hostgroup', params=params)]
+        self.assertEqual(len(names), 101)
+        self.assertEqual(len(set(names)), 101)
+        # Provided parameters are not modified
+        self.assertEqual(params, {'max_results': 3})
+
+        # Iterate over all the pages
+        pages = list(backend.iter_all('hostgroup', params={'max_results': 10}, pages=True))
+        self.assertEqual(len(pages), 11)
+        self.assertEqual([len(page) for page in pages], [10] * 10 + [1])
+
+        # Iterate with pages read ahead in the background
+        prefetched = [hostgroup['name'] for hostgroup
+                      in backend.iter_all('hostgroup', params={'max_results': 3}, prefetch=2)]
+        self.assertEqual(prefetched, names)
+
+        # Iterate with a keyset pagination
+        keyset = list(backend.iter_all('hostgroup', params={'max_results': 3},
+                                       pagination=PAGINATION_KEYSET))
+        self.assertEqual(len(keyset), 101)
+        ids = [hostgroup['_id'] for hostgroup in keyset]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(sorted([hostgroup['name'] for hostgroup in keyset]), sorted(names))
+
+        # Stop iterating before the last page
+        iterator = backend.iter_all('hostgroup', params={'max_results': 3}, prefetch=2)
+        next(iterator)
+        iterator.close()
+
+    def test_2_iter_all_stream(self):
+        """
+        Iterate over all items decoded while the pages are read
+
+        :return: None
+        """
+        print('iterate over all elements decoded from the responses stream')
+
+        backend = Backend(self.backend_address)
+        backend.login('admin', 'admin')
+        hostgroups = list(backend.iter_all('hostgroup', params={'max_results': 10}))
+
+        # Same items as the decoded pages
+        streamed = list(backend.iter_all('hostgroup', params={'max_results': 10}, stream=True))
+        self.assertEqual(streamed, hostgroups)
+        keyset = list(backend.iter_all('hostgroup', params={'max_results': 10}, stream=True,
+                                       pagination=PAGINATION_KEYSET))
+        self.assertEqual([hostgroup['_id'] for hostgroup in keyset],
+                         sorted([hostgroup['_id'] for hostgroup in hostgroups]))
+
+        # Pages as items iterators
+        pages = [len(list(page)) for page in backend.iter_all('hostgroup', stream=True,
+                                                              params={'max_results': 10},
+                                                              pages=True)]
+        self.assertEqual(pages, [10] * 10 + [1])
+
+        # The other response fields are set once the items are read
+        resp = backend._get_stream('hostgroup', params={'max_results': 10})
+        self.assertEqual(len(list(resp['_items'])), 10)
+        self.assertEqual(resp['_items'].count, 10)
+        self.assertEqual(resp['_meta']['total'], 101)
+        self.assertTrue('next' in resp['_links'])
+
+        with assert_raises(BackendException) as cm:
+            backend._get_stream('hostgroup/unknown')
+        self.assertEqual(cm.exception.code, 404)
+
+        # Streamed responses are counted once they are read
+        stats = backend.stats()
+        self.assertEqual(stats['requests']['hostgroup']['GET']['count'], 11 + 11 + 11 + 11 + 2)
+
+        # The items that are not read are skipped before getting the next page
+        ids = [hostgroup['_id'] for hostgroup in hostgroups]
+        for pagination, expected in [(PAGINATION_PAGE, ids[::10]),
+                                     (PAGINATION_KEYSET, sorted(ids)[::10])]:
+            firsts = [next(iter(page)) for page in backend.iter_all('hostgroup', stream=True,
+                                                                    params={'max_results': 10},
+                                                                    pagination=pagination,
+                                                                    pages=True)]
+            self.assertEqual([hostgroup['_id'] for hostgroup in firsts], expected)
+
+        # An items stream continues from its next unread item
+        resp = backend._get_stream('hostgroup', params={'max_results': 10})
+        first = next(iter(resp['_items']))
+        self.assertEqual([first] + list(resp['_items']), hostgroups[:10])
+        backend.logout()
+
+    def test_2_iter_all_stream_errors(self):
+        """
+        Errors while the streamed pages are read
+
+        :return: None
+        """
+        print('errors while reading the responses stream')
+
+        class StalledBody(io.BytesIO):
+            """Response body that stalls, then times out, once its content is read"""
+            def __init__(self, content, stall=0):
+                super(StalledBody, self).__init__(content)
+                self.stall = stall
+
+            def read(self, size=-1):
+                data = super(StalledBody, self).read(size)
+                if not data:
+                    time.sleep(self.stall)
+                    raise ReadTimeoutError(None, None, "Read timed out.")
+                return data
+
+        class StreamSession(object):
+            """Session answering with a streamed body"""
+            def __init__(self, body):
+                self.body = body
+
+            def request(self, **kwargs):
+                """Get the response"""
+                response = requests.Response()
+                response.status_code = 200
+                response.raw = self.body
+                return response
+
+        class Recorder(RequestHooks):
+            """Record the errors"""
+            def __init__(self):
+                self.errors = []
+
+            def on_error(self, method, endpoint, sent, exception, elapsed):
+                self.errors.append(exception.code)
+
+        recorder = Recorder()
+        backend = Backend(self.backend_address, breaker_threshold=10, hooks=[recorder])
+        page = b'{"_items": [{"_id": "5a01", "name": "g1"}, {"_id": "5a02", "name": "g2"}]'
+
+        # A stalled body
+        backend._get_session = lambda: StreamSession(StalledBody(page))
+        with assert_raises(BackendException) as cm:
+            list(backend.iter_all('hostgroup', stream=True))
+        assert_equal(cm.exception.code, BACKEND_ERROR)
+
+        # A truncated body
+        backend._get_session = lambda: StreamSession(io.BytesIO(page))
+        with assert_raises(BackendException) as cm:
+            list(backend.iter_all('hostgroup', stream=True))
+        assert_equal(cm.exception.code, BACKEND_ERROR)
+
+        # A body stalled until the deadline
+        backend._get_session = lambda: StreamSession(StalledBody(page, stall=0.2))
+        with assert_raises(BackendException) as cm:
+            list(backend.iter_all('hostgroup', stream=True, deadline=0.1))
+        assert_equal(cm.exception.code, BACKEND_TIMEOUT)
+
+        # The errors are notified to the hooks and counted by the circuit breaker
+        assert_equal(recorder.errors, [BACKEND_ERROR, BACKEND_ERROR, BACKEND_TIMEOUT])
+        assert_equal(backend.breaker.failures, 3)
+        assert_equal(backend.stats()['requests']['hostgroup']['GET']['errors'], 3)
+
+    def test_2_projection(self):
+        """
+        Get only some fields of the items
+
+        :return: None
+        """
+        print('get only some fields')
+
+        # Create client API
+        backend = Backend(self.backend_address)
+        backend.login('admin', 'admin')
+
+        items = backend.get('hostgroup', params={'max_results': 3}, fields=['name'])
+        for item in items['_items']:
+            assert_true('name' in item)
+            assert_true('_id' in item)
+            assert_true('_realm' not in item)
+
+        items = backend.get_all('hostgroup', fields=['name', '_realm'])
+        self.assertEqual(len(items['_items']), 101)
+        for item in items['_items']:
+            assert_true('name' in item)
+            assert_true('_realm' in item)
+            assert_true('hosts' not in item)
+
+        for item in backend.iter_all('hostgroup', fields=['name']):
+            assert_true('name' in item)
+            assert_true('_realm' not in item)
+
+    def test_2_etag_cache(self):
+        """
+        Get an item several times with conditional requests
+
+        :return: None
+        """
+        print('get an item with the ETag cache')
+
+        # Create client API
+        backend = Backend(self.backend_address, etag_cache=True)
+        backend.login('admin', 'admin')
+
+        # Record the backend responses status
+        statuses = []
+        get_response = backend.get_response
+
+        def recording_get_response(*args, **kwargs):
+            """Record the response status"""
+            response = get_response(*args, **kwargs)
+            statuses.append(response.status_code)
+            return response
+        backend.get_response = recording_get_response
+
+        hostgroup = backend.get('hostgroup', params={'max_results': 1})['_items'][0]
+        endpoint = 'hostgroup/%s' % hostgroup['_id']
+
+        first = backend.get(endpoint)
+        # Modifying the got item does not modify the cache
+        first['name'] = 'modified'
+        second = backend.get(endpoint)
+        assert_equal(second['name'], hostgroup['name'])
+        assert_equal(second['_etag'], hostgroup['_etag'])
+        assert_equal(statuses[-2:], [200, 304])
+
+        # Updated item is got again
+        backend.patch(endpoint, {'alias': 'updated'}, headers={'If-Match': second['_etag']})
+        third = backend.get(endpoint)
+        assert_equal(statuses[-1], 200)
+        assert_equal(third['alias'], 'updated')
+        assert_true(third['_etag'] != second['_etag'])
+
+        # The kept responses are bounded
+        for hostgroup in backend.get_all('hostgroup')['_items']:
+            backend.get('hostgroup/%s' % hostgroup['_id'])
+        assert_true(0 < len(backend._etags) <= ETAG_CACHE_SIZE)
+
+        # A new token does not use the responses got with the previous one
+        backend.login('admin', 'admin', generate='force')
+        assert_equal(len(backend._etags), 0)
+        backend.get(endpoint)
+        assert_equal(statuses[-1], 200)
+
+    def test_2_response_cache(self):
+        """
+        Get the same items several times with the responses cache
+
+        :return: None
+        """
+        print('get items with the responses cache')
+
+        # Create client API
+        backend = Backend(self.backend_address, cache_size=2, cache_ttl=60)
+        backend.login('admin', 'admin')
+
+        # Record the backend requests
+        calls = []
+
+        def record_requests(backend):
+            """Record the requests sent by a client"""
+            get_response = backend.get_response
+
+            def recording_get_response(*args, **kwargs):
+                """Record the request method and endpoint"""
+                calls.append((kwargs['method'], kwargs['endpoint']))
+                return get_response(*args, **kwargs)
+            backend.get_response = recording_get_response
+        record_requests(backend)
+
+        params = {'where': json.dumps({'name': 'All'}), 'max_results': 1}
+        first = backend.get('realm', params=params)
+        # Modifying the got items does not modify the cache
+        first['_items'][0]['name'] = 'modified'
+        # Same parameters in another order
+        second = backend.get('realm', params={'max_results': 1,
+                                              'where': json.dumps({'name': 'All'})})
+        assert_equal(second['_items'][0]['name'], 'All')
+        assert_equal(len(calls), 1)
+
+        # Ignore the cache
+        backend.get('realm', params=params, cache=False)
+        assert_equal(len(calls), 2)
+
+        # Least recently used responses are discarded
+        hostgroups = backend.get('hostgroup', params={'max_results': 2})
+        backend.get('hostgroup', params={'max_results': 3})
+        backend.get('hostgroup', params={'max_results': 2})
+        assert_equal(len(calls), 4)
+        backend.get('realm', params=params)
+        assert_equal(len(calls), 5)
+
+        # Writing on a resource drops its cached responses
+        hostgroup = hostgroups['_items'][0]
+        backend.patch('hostgroup/%s' % hostgroup['_id'], {'alias': 'cached'},
+                      headers={'If-Match': hostgroup['_etag']})
+        hostgroups = backend.get('hostgroup', params={'max_results': 2})
+        assert_equal(calls[-1], ('GET', 'hostgroup'))
+        assert_equal(len(calls), 7)
+        assert_equal(hostgroups['_items'][0]['alias'], 'cached')
+        backend.get('realm', params=params)
+        assert_equal(len(calls), 7)
+
+        # Expired responses are got again
+        backend = Backend(self.backend_address, cache_size=10, cache_ttl=0.5)
+        backend.login('admin', 'admin')
+        record_requests(backend)
+        backend.get('realm', params=params)
+        backend.get('realm', params=params)
+        time.sleep(1)
+        backend.get('realm', params=params)
+        assert_equal(len(calls), 9)
+
+    def test_2_compression(self):
+        """
+        Get the compression statistics
+
+        :return: None
+        """
+        print('get the compression statistics')
+
+        # Create client API
+        backend = Backend(self.backend_address, compress_threshold=1024)
+        backend.login('admin', 'admin')
+        assert_true('gzip' in backend.session.headers['Accept-Encoding'])
+
+        backend.get_all('hostgroup')
+        stats = backend.stats()['compression']
+        # Login and the hostgroups pages
+        assert_true(stats['responses']['count'] >= 2)
+        assert_true(stats['responses']['bytes'] >= stats['responses']['wire_bytes'] > 0)
+        assert_true(stats['responses']['ratio'] >= 1)
+        # No request was compressed
+        assert_equal(stats['requests']['count'], 0)
+        assert_equal(stats['requests']['ratio'], None)
+
+        data = b'{"name": "compressed"}' * 100
+        assert_equal(zlib.decompress(backend._compress(data), 16 + zlib.MAX_WBITS), data)
+
+    def test_2_connections(self):
+        """
+        Get the connections statistics of concurrent requests
+
+        :return: None
+        """
+        print('get the connections statistics')
+
+        # Connection pools sized from the processes number
+        backend = Backend(self.backend_address, processes=16, executor=EXECUTOR_THREAD)
+        assert_equal(backend.pool_maxsize, 16)
+        assert_equal(backend.session.get_adapter(self.backend_address)._pool_maxsize, 16)
+        assert_equal(Backend(self.backend_address).pool_maxsize, 10)
+        backend.login('admin', 'admin')
+
+        def get_hostgroups(_):
+            """Get some hostgroups from a thread sharing the client session"""
+            for _ in range(10):
+                backend.get('hostgroup', params={'max_results': 10})
+
+        threads = [threading.Thread(target=get_hostgroups, args=(num,)) for num in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = backend.stats()['connections']
+        # Login and the 160 requests
+        assert_equal(stats['requests'], 161)
+        assert_true(stats['connections'] <= 16)
+        assert_true(stats['reuse_rate'] >= 0.9)
+
+        # Worker sessions statistics
+        backend.get_all('hostgroup', params={'max_results': 10})
+        stats = backend.stats()['connections']
+        assert_equal(stats['requests'], 161 + 11)
+
+        # Statistics are kept after the sessions are closed
+        backend.logout()
+        assert_equal(backend.stats()['connections']['requests'], 161 + 11 + 1)
+
+    def test_2_timeouts(self):
+        """
+        Requests timeouts and get all deadline
+
+        :return: None
+        """
+        print('get with timeouts and deadlines')
+
+        backend = Backend(self.backend_address, connect_timeout=5, read_timeout=30)
+        assert_equal(backend.timeout, (5, 30))
+        assert_equal(Backend(self.backend_address).timeout, None)
+        backend.login('admin', 'admin')
+
+        # Per call timeout
+        resp = backend.get('hostgroup', params={'max_results': 10}, timeout=10)
+        assert_equal(len(resp['_items']), 10)
+
+        # A large enough deadline
+        resp = backend.get_all('hostgroup', params={'max_results': 10}, deadline=60)
+        assert_equal(len(resp['_items']), 101)
+
+        # An exceeded deadline, whatever the executor
+        for client in [backend, Backend(self.backend_address, processes=4),
+                       Backend(self.backend_address, processes=4, executor=EXECUTOR_THREAD)]:
+            client.login('admin', 'admin')
+            with assert_raises(BackendException) as cm:
+                client.get_all('hostgroup', params={'max_results': 10}, deadline=0.000001)
+            assert_equal(cm.exception.code, BACKEND_TIMEOUT)
+
+            with assert_raises(BackendException) as cm:
+                list(client.iter_all('hostgroup', params={'max_results': 10},
+                                     deadline=0.000001))
+            assert_equal(cm.exception.code, BACKEND_TIMEOUT)
+            client.logout()
+
+    def test_2_retries(self):
+        """
+        Requests retry policy and circuit breaker
+
+        :return: None
+        """
+        print('retry policy and circuit breaker')
+
+        backend = Backend(self.backend_address, retries=3, retry_backoff=1, retry_jitter=0.5)
+        retry = backend.session.get_adapter(self.backend_address).max_retries
+        assert_equal(retry.total, 3)
+        assert_equal(retry.status_forcelist, [502, 503, 504])
+        # POST requests are only retried on connection errors
+        assert_true(retry.is_retry('GET', 503))
+        assert_true(not retry.is_retry('POST', 503))
+        # PATCH requests are refused with a 412 error if they were already applied
+        assert_true(retry.is_retry('PATCH', 503))
+        # Backoff between 2 and 4 seconds after 3 errors
+        for _ in range(3):
+            retry = retry.increment('GET', '/hostgroup')
+        for _ in range(10):
+            assert_true(2 <= retry.get_backoff_time() <= 4)
+
+        # Circuit breaker, no backend is listening on this port
+        backend = Backend('http://127.0.0.1:5099', retries=0, breaker_threshold=2,
+                          breaker_cooldown=0.5)
+        for code in [BACKEND_ERROR, BACKEND_ERROR, BACKEND_UNAVAILABLE, BACKEND_UNAVAILABLE]:
+            with assert_raises(BackendException) as cm:
+                backend.get('hostgroup')
+            assert_equal(cm.exception.code, code)
+        assert_equal(backend.breaker.state, 'open')
+
+        # Any exception while probing the backend opens the circuit again
+        class BrokenSession(object):
+            """Session failing with an unexpected exception"""
+            def request(self, **kwargs):
+                """Fail to send a request"""
+                raise ValueError("Broken session")
+
+        time.sleep(0.6)
+        backend._get_session = BrokenSession
+        with assert_raises(ValueError):
+            backend.get('hostgroup')
+        del backend._get_session
+        assert_equal(backend.breaker.state, 'open')
+        with assert_raises(BackendException) as cm:
+            backend.get('hostgroup')
+        assert_equal(cm.exception.code, BACKEND_UNAVAILABLE)
+
+        # The backend is probed after the cool-down
+        time.sleep(0.6)
+        backend.url_endpoint_root = self.backend_address
+        backend.login('admin', 'admin')
+        assert_equal(backend.breaker.state, 'closed')
+        backend.get('hostgroup')
+        backend.logout()
+
+    def test_2_stats(self):
+        """
+        Requests hooks and metrics
+
+        :return: None
+        """
+        print('requests hooks and metrics')
+
+        class Recorder(RequestHooks):
+            """Record the hooks calls"""
+            def __init__(self):
+                self.calls = []
+
+            def before_request(self, method, endpoint, sent):
+                self.calls.append(('before', method, endpoint))
+
+            def after_response(self, method, endpoint, sent, response, elapsed):
+                self.calls.append(('after', method, endpoint, response.status_code))
+
+            def on_error(self, method, endpoint, sent, exception, elapsed):
+                self.calls.append(('error', method, endpoint, exception.code))
+
+        recorder = Recorder()
+        backend = Backend(self.backend_address, hooks=[recorder])
+        backend.login('admin', 'admin')
+        backend.get_all('hostgroup', params={'max_results': 10})
+        with assert_raises(BackendException):
+            backend.get('hostgroup/unknown')
+
+        assert_equal(recorder.calls[0], ('before', 'POST', 'login'))
+        assert_equal(recorder.calls[1], ('after', 'POST', 'login', 200))
+        assert_equal(recorder.calls[-1], ('after', 'GET', 'hostgroup/unknown', 404))
+        assert_equal(len(recorder.calls), 2 * (1 + 11 + 1))
+
+        stats = backend.stats()
+        print("Stats: %s" % stats)
+        login = stats['requests']['login']['POST']
+        assert_equal(login['count'], 1)
+        assert_true(login['sent'] > 0)
+        hostgroups = stats['requests']['hostgroup']['GET']
+        assert_equal(hostgroups['count'], 12)
+        assert_equal(hostgroups['errors'], 0)
+        assert_equal(hostgroups['status'], {200: 11, 404: 1})
+        assert_true(hostgroups['received'] > 0)
+        assert_equal(hostgroups['retries'], 0)
+        assert_equal(hostgroups['latency']['buckets'][-1], ('+Inf', 12))
+        assert_true(0 < hostgroups['latency']['mean'] <= hostgroups['latency']['max'])
+        assert_equal(stats['connections']['requests'], 13)
+        assert_equal(stats['compression']['responses']['count'], 13)
+        backend.hooks.remove(recorder)
+        backend.logout()
+
+        # Requests without response
+        backend = Backend('http://127.0.0.1:5099', retries=0, metrics=False, hooks=[recorder])
+        with assert_raises(BackendException):
+            backend.get('hostgroup')
+        assert_equal(recorder.calls[-1], ('error', 'GET', 'hostgroup', BACKEND_ERROR))
+        assert_equal(backend.stats()['requests'], {})
+
+    def test_2_join(self):
+        """
+        Join the linked documents on the client side
+
+        :return: None
+        """
+        print('join the linked documents')
+        backend = Backend(self.backend_address)
+        backend.login('admin', 'admin')
+
+        embedded = backend.get_all('hostgroup', params={
+            'max_results': 10, 'embedded': json.dumps({'_realm': 1, '_parent': 1})})['_items']
+        backend.metrics.reset()
+        joined = backend.get_all('hostgroup', params={'max_results': 10},
+                                 join={'_realm': 'realm', '_parent': 'hostgroup'})['_items']
+        assert_equal(len(joined), len(embedded))
+        for item, expected in zip(sorted(joined, key=lambda item: item['_id']),
+                                  sorted(embedded, key=lambda item: item['_id'])):
+            assert_equal(item['_realm']['_id'], expected['_realm']['_id'])
+            assert_equal(item['_realm']['name'], 'All')
+            assert_true('_links' not in item['_realm'])
+            if expected.get('_parent'):
+                assert_equal(item['_parent']['name'], expected['_parent']['name'])
+        # The linked documents are shared and got once
+        assert_true(joined[0]['_realm'] is joined[-1]['_realm'])
+        assert_equal(backend.stats()['requests']['realm']['GET']['count'], 1)
+
+        # Linked documents already got
+        items = [{'_realm': self.realmAll_id, 'users': [self.realmAll_id, 'unknown']},
+                 {'_realm': None}]
+        documents = backend._join_items(items, {'_realm': 'realm', 'users': 'realm'})
+        assert_true(items[0]['_realm'] is items[0]['users'][0])
+        assert_equal(items[0]['users'][1], 'unknown')
+        assert_true(items[1]['_realm'] is None)
+        backend.metrics.reset()
+        items = [{'_realm': self.realmAll_id}]
+        backend._join_items(items, {'_realm': 'realm'}, documents=documents)
+        assert_equal(items[0]['_realm']['name'], 'All')
+        assert_equal(backend.stats()['requests'], {})
+
+        # Compact store
+        compact = backend.get_all('hostgroup', params={'max_results': 10}, compact=True,
+                                  join={'_realm': 'realm'})['_items']
+        assert_equal(compact[0]['_realm']['name'], 'All')
+        backend.logout()
+
     def test_3_page_after_page(self):
         """
         Get page after page manually
@@ -7,12 +7,25 @@ This test test multiprocess for get items in backend
 from __future__ import print_function
 import os
 import time
+import threading
+import multiprocessing
 import shlex
 import subprocess
 import unittest2
-from alignak_backend_client.client import Backend
+from alignak_backend_client.client import Backend, EXECUTOR_THREAD, PAGINATION_KEYSET
 
 
+def get_realms(backend):
+    """
+    Get the realms in a forked process, as the get_all forked processes do
+
+    :param backend: client of the parent process
+    :type backend: Backend
+    :return: None
+    """
+    backend._init_process()  # pylint: disable=protected-access
+    backend.get('realm')
+
 class test_multiprocess(unittest2.TestCase):
     """
     test multiprocess to get items in backend
@@ -78,10 +91,10 @@ class test_multiprocess(unittest2.TestCase):
 
         # add 2000 commands
         backend.delete("command", {})
-        data = {'command_line': 'check_ping', '_realm': realm_id}
-        for i in range(1, 2001):
-            data['name'] = "cmd %d" % i
-            backend.post('command', data)
+        commands = [{'name': "cmd %d" % i, 'command_line': 'check_ping', '_realm': realm_id}
+                    for i in range(1, 2001)]
+        results = backend.post_many('command', commands)
+        self.assertEqual([result['_status'] for result in results], ['OK'] * 2000)
 
         # get without multiprocess
         backend_yannsolo = Backend(self.backend_address)
@@ -104,8 +117,76 @@ class test_multiprocess(unittest2.TestCase):
         ids_final = set(ids)
         self.assertEqual(len(ids_final), 2002, "Number of id unique")
 
+        # get with a thread pool (8 threads)
+        backend_threads = Backend(self.backend_address, 8, executor=EXECUTOR_THREAD)
+        backend_threads.login('admin', 'admin')
+        start_time = time.time()
+        resp = backend_threads.get_all('command', {'max_results': 20})
+        pool_8 = time.time() - start_time
+        self.assertEqual(len(resp['_items']), 2002, "Number of commands in thread pool mode")
+        ids = [dat['_id'] for dat in resp['_items']]
+        self.assertEqual(len(set(ids)), 2002, "Number of id unique")
+
+        # the pool is kept alive, a second call re-uses the workers connections
+        start_time = time.time()
+        resp = backend_threads.get_all('command', {'max_results': 20})
+        pool_8_again = time.time() - start_time
+        self.assertEqual(len(resp['_items']), 2002, "Number of commands in thread pool mode")
+
+        # the pool lock is not held while the workers are joined
+        backend_threads._get_pool(16)
+        closing = threading.Thread(target=backend_threads.close_pool)
+        closing.start()
+        closing.join(10)
+        self.assertFalse(closing.is_alive(), "Pool closed")
+        backend_threads.logout()
+
+        # the forked processes do not inherit a lock held by another thread
+        with backend._pool_lock:  # pylint: disable=protected-access
+            resp = backend.get_all('command', {'max_results': 20}, deadline=60)
+        self.assertEqual(len(resp['_items']), 2002, "Number of commands with a held lock")
+
+        # nor the requests locks: metrics, statistics, responses caches and circuit breaker
+        backend_locks = Backend(self.backend_address, 8, etag_cache=True, cache_size=10,
+                                breaker_threshold=5)
+        backend_locks.login('admin', 'admin')
+        # pylint: disable=protected-access
+        locks = [backend_locks._pool_lock, backend_locks._stats_lock,
+                 backend_locks.metrics._lock, backend_locks.breaker._lock,
+                 backend_locks._cache._lock, backend_locks._etags._lock]
+        for lock in locks:
+            with lock:
+                proc = multiprocessing.Process(target=get_realms, args=(backend_locks,))
+                proc.start()
+            proc.join(30)
+            if proc.is_alive():
+                proc.terminate()
+            self.assertEqual(proc.exitcode, 0, "Request in a process forked with a held lock")
+        backend_locks.logout()
+
+        # get with a keyset pagination, sequential and parallel
+        start_time = time.time()
+        resp = backend_yannsolo.get_all('command', {'max_results': 20},
+                                        pagination=PAGINATION_KEYSET)
+        keyset_1 = time.time() - start_time
+        ids = [dat['_id'] for dat in resp['_items']]
+        self.assertEqual(len(set(ids)), 2002, "Number of id unique")
+        self.assertEqual(ids, sorted(ids), "Sorted by _id")
+
+        for executor in ['process', EXECUTOR_THREAD]:
+            backend_keyset = Backend(self.backend_address, 8, executor=executor,
+                                     pagination=PAGINATION_KEYSET)
+            backend_keyset.login('admin', 'admin')
+            resp = backend_keyset.get_all('command', {'max_results': 20})
+            ids_keyset = [dat['_id'] for dat in resp['_items']]
+            self.assertEqual(ids_keyset, ids, "Same items with a parallel keyset pagination")
+            backend_keyset.logout()
+
         print(threads_1)
         print(threads_8)
+        print(pool_8)
+        print(pool_8_again)
+        print(keyset_1)
 
         # threads_8 must be better than 2 time more faster
         # Disable on travis because have only 1 cpu
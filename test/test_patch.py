@@ -11,8 +11,9 @@ import shlex
 import subprocess
 import requests
 import unittest2
-from nose.tools import assert_true, assert_raises
+from nose.tools import assert_true, assert_equal, assert_raises
 from alignak_backend_client.client import Backend, BackendException
+from helpers import get_commands
 
 
 class TestPatchClient(unittest2.TestCase):
@@ -116,6 +117,52 @@ class TestPatchClient(unittest2.TestCase):
                                  data=data, headers=headers, inception=True)
         assert_true(response['_status'] == 'OK')
 
+    def test_1_patch_many(self):
+        """
+        Test patch many items, some with a bad _etag
+
+        :return: None
+        """
+        backend = Backend(self.backend_address)
+        backend.login('admin', 'admin')
+
+        commands = get_commands('patched command', self.realmAll_id, 20)
+        results = backend.post_many('command', commands)
+
+        items = []
+        for num, result in enumerate(results):
+            etag = result['_etag'] if num % 2 else 'bad etag'
+            items.append(('command/%s' % result['_id'], etag, {'alias': 'patched %d' % num}))
+        # An unknown field
+        items[5] = (items[5][0], items[5][1], {'bad_field': 'unknown in data model'})
+
+        # Without inception, the items with a bad etag are not updated
+        results = backend.patch_many(items, concurrency=4, inception=False)
+        assert_equal(len(results), 20)
+        for num, result in enumerate(results):
+            if num == 5:
+                assert_equal(result['_error']['code'], 422)
+                assert_true('bad_field' in result['_issues'])
+            elif num % 2:
+                assert_equal(result['_status'], 'OK')
+            else:
+                assert_equal(result['_status'], 'ERR')
+                # The backend error is in the result, not the raw response content
+                assert_equal(result['_error'], {'code': 412,
+                                                'message': "Client and server etags don't match"})
+
+        # With inception, the _etag is refreshed
+        results = backend.patch_many(items, concurrency=4)
+        for num, result in enumerate(results):
+            if num == 5:
+                assert_equal(result['_error']['code'], 422)
+            else:
+                assert_equal(result['_status'], 'OK')
+                item = backend.get('command/%s' % result['_id'])
+                assert_equal(item['alias'], 'patched %d' % num)
+
+        backend.logout()
+
     def test_2_patch_exception(self):
         """
         Test patch a user with errors (so exceptions)
@@ -6,13 +6,15 @@ Test the POST request (add items of resource/endpoint) in the backend
 
 from __future__ import print_function
 import os
+import json
 import time
 import shlex
 import subprocess
 import requests
 import unittest2
-from nose.tools import assert_true, assert_raises
+from nose.tools import assert_true, assert_equal, assert_raises
 from alignak_backend_client.client import Backend, BackendException
+from helpers import get_commands
 
 
 class TestPostClient(unittest2.TestCase):
@@ -101,6 +103,44 @@ class TestPostClient(unittest2.TestCase):
         assert_true('_updated' in response)
         assert_true(response['_created'] == response['_updated'])
 
+    def test_1_post_many(self):
+        """
+        Test post many commands with list payloads
+
+        :return: None
+        """
+        backend = Backend(self.backend_address)
+        backend.login('admin', 'admin')
+
+        print('create many commands')
+        commands = get_commands('bulk command', self.realmAll_id, 25)
+        results = backend.post_many('command', commands, chunk_size=10)
+        assert_equal(len(results), 25)
+        for result in results:
+            assert_equal(result['_status'], 'OK')
+            assert_true('_id' in result)
+        assert_equal(len(set([result['_id'] for result in results])), 25)
+
+        # Some invalid commands, the valid ones of the same chunks are created
+        commands = get_commands('parallel command', self.realmAll_id, 25)
+        commands[3].pop('name')
+        commands[17].pop('name')
+        results = backend.post_many('command', commands, chunk_size=10, concurrency=3)
+        assert_equal(len(results), 25)
+        for num, result in enumerate(results):
+            if num in [3, 17]:
+                assert_equal(result['_status'], 'ERR')
+                assert_true('_issues' in result)
+            else:
+                assert_equal(result['_status'], 'OK')
+                assert_true('_id' in result)
+        names = [command['name'] for command in commands if 'name' in command]
+        items = backend.get_all('command', params={'where': json.dumps({'name': {'$in': names}})})
+        assert_equal(len(items['_items']), 23)
+
+        # Close the thread pool
+        backend.logout()
+
     def test_2_post_exceptions(self):
         """
         Test post a user with errors (so exceptions)